@@ -0,0 +1,333 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+
+Micro-benchmarks of the hot paths: the converter handlers, the note reads of
+Qnap and the json decoding. The results can be saved as baseline, a check
+against the baseline fails when a benchmark got slower than the threshold
+and stays slower when it is timed again.
+
+>python benchmark.py --save            (stores the baseline)
+>python benchmark.py --check           (exit code 1 on a regression, 2 without baseline)
+
+The baseline is machine specific and therefore not part of the repository, it
+is kept in NotesImport/BenchmarkFiles/Baseline.json unless --baseline is given.
+'''
+
+import sys
+from os.path import join, abspath, dirname, exists
+from os import chdir, makedirs
+from tempfile import TemporaryDirectory
+from zipfile import ZipFile, ZIP_DEFLATED
+import argparse
+import platform
+import logging
+import json
+import statistics
+import time
+import gc
+
+from importer import Importer
+from joplin_database import JoplinDatabase
+from model import Node
+
+
+class Corpus(object):
+    '''
+    Representative note trees, one kind per converter handler
+    '''
+
+    @classmethod
+    def build(cls, notes):
+        '''
+        Builds the corpus
+        @param notes: number of notes per kind
+        @return: dictionary kind -> list of note trees (doc nodes as dictionaries)
+        '''
+        builders = {
+            'tables': cls.table,
+            'lists': cls.lists,
+            'code': cls.code,
+            'marks': cls.marks,
+            'links': cls.links }
+        return { kind: [cls.doc(builder(i) for _ in range(10)) for i in range(notes)]
+                 for kind, builder in builders.items() }
+
+
+    @classmethod
+    def doc(cls, content):
+        '''
+        A note of the given top level content
+        '''
+        return { 'type': 'doc', 'content': list(content) }
+
+
+    @classmethod
+    def para(cls, *items):
+        '''
+        A paragraph
+        '''
+        return { 'type': 'paragraph', 'content': list(items) }
+
+
+    @classmethod
+    def text(cls, text, *marks):
+        '''
+        A text with marks
+        '''
+        node = { 'type': 'text', 'text': text }
+        if marks:
+            node['marks'] = list(marks)
+        return node
+
+
+    @classmethod
+    def table(cls, i, rows = 8, columns = 5):
+        '''
+        A table of short cells
+        '''
+        return { 'type': 'table', 'content': [
+            { 'type': 'table_row', 'content': [
+                { 'type': 'table_cell', 'content': [cls.para(cls.text(f'cell {i}.{row}.{column}'))] }
+                for column in range(columns)] }
+            for row in range(rows)] }
+
+
+    @classmethod
+    def lists(cls, i, depth = 3, width = 3):
+        '''
+        Bullet, ordered and check lists nested into each other
+        '''
+        def level(n):
+            items = []
+            for k in range(width):
+                content = [cls.para(cls.text(f'item {i}.{n}.{k}'))]
+                if n < depth:
+                    content.append(level(n + 1))
+                items.append({ 'type': 'list_item', 'content': content })
+            return { 'type': 'bullet_list' if n % 2 else 'ordered_list', 'content': items }
+
+        checks = { 'type': 'check_list', 'content': [
+            { 'type': 'check_list_item', 'attrs': { 'checked': k % 2 == 0 }, 'content': [cls.para(cls.text(f'task {k}'))] }
+            for k in range(width)] }
+        outer = level(1)
+        outer['content'][0]['content'].append(checks)
+        return outer
+
+
+    @classmethod
+    def code(cls, i, lines = 12):
+        '''
+        A code block
+        '''
+        return { 'type': 'code_block', 'content': [
+            cls.text(''.join(f'value_{i}_{line} = compute({line}, [{i}])\n' for line in range(lines)))] }
+
+
+    @classmethod
+    def marks(cls, i):
+        '''
+        A paragraph of text with mixed marks and hard breaks
+        '''
+        marks = [[], [{ 'type': 'strong' }], [{ 'type': 'em' }], [{ 'type': 'strong' }, { 'type': 'em' }],
+                 [{ 'type': 'superscript' }], [{ 'type': 'subscript' }]]
+        items = []
+        for k, mark in enumerate(marks * 3):
+            items.append(cls.text(f'word {i} {k} ', *mark))
+            if k % 5 == 4:
+                items.append({ 'type': 'hard_break' })
+        return cls.para(*items)
+
+
+    @classmethod
+    def links(cls, i):
+        '''
+        A paragraph of links, images and attachments
+        '''
+        items = []
+        for k in range(6):
+            items.append(cls.text(f'link {k}', { 'type': 'link', 'attrs': { 'href': f'https://example.org/{i}/{k}' } }))
+            items.append(cls.text(' '))
+        items.append({ 'type': 'image', 'attrs': { 'src': f'x/image/img{i}', 'title': f'img{i}.png' } })
+        items.append({ 'type': 'file', 'attrs': { 'src': f'x/attachment/att{i}', 'title': f'att{i}.pdf' } })
+        return cls.para(*items)
+
+
+class Benchmark(object):
+    '''
+    Runs the micro-benchmarks over an archive written from the corpus
+    Every benchmark is timed in several rounds with the garbage collector off,
+    the median round counts. Results are seconds per note.
+    '''
+
+    def __init__(self, notes = 50, repeat = 9, min_time = 0.2):
+        '''
+        Constructor
+        @param notes: number of notes per kind of the corpus
+        @param repeat: number of rounds per benchmark
+        @param min_time: minimum seconds of a round, small benchmarks loop the corpus
+        '''
+        self.notes = notes
+        self.repeat = repeat
+        self.min_time = min_time
+
+
+    def run(self, names = None):
+        '''
+        Runs the benchmarks
+        @param names: names of the benchmarks to run, all if None
+        @return: dictionary benchmark name -> seconds per note
+        '''
+        corpus = Corpus.build(self.notes)
+        results = {}
+        with TemporaryDirectory() as folder:
+            archive = self._write_archive(folder, corpus)
+            profile = join(folder, 'profile')
+            JoplinDatabase.create_schema(profile)
+            importer = Importer(None, archive, '', '', database = profile)
+            level = importer.logger.level
+            importer.logger.setLevel(logging.ERROR)                                     # the corpus' code blocks warn
+            try:
+                locations = [f'{kind}/{i}' for kind in corpus for i in range(self.notes)]
+                raws = [importer.qnap._read_note(location) for location in locations]
+                contents = [json.dumps(doc) for docs in corpus.values() for doc in docs]
+                benchmarks = {
+                    'qnap.read': (importer.qnap._read_note, locations),
+                    'qnap.decode': (importer.qnap._decode_note, raws),
+                    'model.build': (lambda content: Node.build(json.loads(content)), contents) }
+                for kind in corpus:                                                     # input as in the import pipeline
+                    benchmarks[f'convert.{kind}'] = (importer._convert_note, [
+                        importer.qnap._decode_note(raw)['content']
+                        for location, raw in zip(locations, raws) if location.startswith(f'{kind}/')])
+
+                for name, (func, items) in benchmarks.items():
+                    if names is None or name in names:
+                        results[name] = self._time(func, items)
+            finally:
+                importer.logger.setLevel(level)
+                importer.close()
+        return results
+
+
+    @classmethod
+    def save(cls, path, results):
+        '''
+        Stores results as baseline
+        '''
+        folder = dirname(path)
+        if folder and not exists(folder):
+            makedirs(folder)
+        with open(path, 'w') as f:
+            json.dump({ 'python': platform.python_version(), 'machine': platform.node(),
+                        'benchmarks': results }, f, indent = 4)
+
+
+    @classmethod
+    def check(cls, path, results, threshold):
+        '''
+        Compares results with the baseline
+        @param threshold: tolerated slow down, 0.2 means 20 percent
+        @return: list of (name, baseline, result) of the regressed benchmarks
+        '''
+        with open(path, 'r') as f:
+            baseline = json.load(f)['benchmarks']
+        return [(name, baseline[name], result) for name, result in results.items()
+                if name in baseline and result > baseline[name] * (1 + threshold)]
+
+
+    def _time(self, func, items):
+        '''
+        Returns the median seconds per item of the rounds
+        '''
+        start = time.perf_counter()
+        for item in items:                                                              # warm up and calibration
+            func(item)
+        loops = max(1, int(self.min_time / max(time.perf_counter() - start, 1e-9)))
+
+        rounds = []
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(self.repeat):
+                start = time.perf_counter()
+                for _ in range(loops):
+                    for item in items:
+                        func(item)
+                rounds.append((time.perf_counter() - start) / (loops * len(items)))
+        finally:
+            if enabled:
+                gc.enable()
+        return statistics.median(rounds)
+
+
+    def _write_archive(self, folder, corpus):
+        '''
+        Writes the corpus as Notes Station archive, a notebook per kind
+        '''
+        path = join(folder, 'corpus.ns3')
+        structure = { 'notebooks': [] }
+        with ZipFile(path, 'w', ZIP_DEFLATED) as zip_file:
+            for kind, docs in corpus.items():
+                notes = []
+                for i, doc in enumerate(docs):
+                    location = f'{kind}/{i}'
+                    note_file = { 'note_name': f'{kind} {i}', 'content': json.dumps(doc), 'tag_list': [] }
+                    zip_file.writestr(f'{location}/noteInfo.json', json.dumps(note_file))
+                    notes.append({ 'note_location': location })
+                structure['notebooks'].append({ 'nb_name': kind, 'sec_list': [{ 'sec_name': kind, 'note_list': notes }] })
+            zip_file.writestr('data.json', json.dumps(structure))
+        return path
+
+
+    @classmethod
+    def main(cls, argv = None):
+        '''
+        The main method
+        @return: the exit code, 1 if the check found a regression, 2 if the baseline is missing
+        '''
+        parser = argparse.ArgumentParser(description = 'Micro-benchmarks of converter and archive reader')
+        folder = dirname(abspath(__file__))
+        parser.add_argument('--baseline', default = join(folder, 'BenchmarkFiles', 'Baseline.json'),
+                            help = 'path of the baseline json, created by --save')
+        parser.add_argument('--save', action = 'store_true', help = 'stores the results as baseline')
+        parser.add_argument('--check', action = 'store_true', help = 'fails on a regression against the baseline')
+        parser.add_argument('--threshold', type = float, default = 0.2, help = 'tolerated slow down, 0.2 for 20%%')
+        parser.add_argument('--notes', type = int, default = 50, help = 'notes per kind of the corpus')
+        parser.add_argument('--repeat', type = int, default = 9, help = 'rounds per benchmark')
+        parser.add_argument('--retries', type = int, default = 2, help = 'times a regressed benchmark is timed again')
+        args = parser.parse_args(argv)
+
+        args.baseline = abspath(args.baseline)
+        if args.check and not args.save and not exists(args.baseline):
+            sys.stderr.write(f'No baseline found: {args.baseline}\nCreate it with --save on the reference machine\n')
+            return 2
+        
+        chdir(folder)
+        if not exists('LoggingFiles'):
+            makedirs('LoggingFiles')
+
+        benchmark = cls(args.notes, args.repeat)
+        results = benchmark.run()
+        for name, result in results.items():
+            print(f'{name:20} {result * 1e6:10.1f} us/note')
+
+        if args.save:
+            cls.save(args.baseline, results)
+            print(f'Baseline saved: {args.baseline}')
+        if args.check:
+            regressions = cls.check(args.baseline, results, args.threshold)
+            for _ in range(args.retries):                                               # rules out a noisy round
+                if not regressions:
+                    break
+                results.update(benchmark.run([name for name, _, _ in regressions]))
+                regressions = cls.check(args.baseline, results, args.threshold)
+            for name, baseline, result in regressions:
+                print(f'REGRESSION {name}: {baseline * 1e6:.1f} -> {result * 1e6:.1f} us/note')
+            return 1 if regressions else 0
+        return 0
+
+
+if __name__ == '__main__':
+
+    sys.exit(Benchmark.main())
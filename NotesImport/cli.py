@@ -0,0 +1,187 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+
+Command line alternative to the Gui. Defaults are taken from the same
+configuration file, the same ASSUMPTION about its location holds.
+'''
+
+import sys
+from os.path import join, abspath, dirname, exists
+from os import chdir, mkdir
+import json
+import argparse
+
+from importer import Importer
+from sharded_import import ShardedImport
+from watcher import Watcher
+from events import Event, EventBus
+
+
+class Cli(object):
+    '''
+    Imports a Qnap Notes Station export from the command line showing a progress bar
+    '''
+
+    def __init__(self, args):
+        '''
+        Constructor
+        @param args: the parsed command line arguments
+        '''
+        self.args = args
+        self.importer = None
+        self.errors = 0
+
+
+    @classmethod
+    def main(cls, argv = None):
+        '''
+        The main method
+        '''
+        folder = dirname(abspath(__file__))
+        with open(join(folder, 'ConfigFiles', 'Config.json'), 'r') as f:
+            config = json.load(f)
+
+        def configured(key, default = None):
+            value = config.get(key) or default
+            return join(folder, value) if value else None                               # relative to the GUI's folder
+
+        parser = argparse.ArgumentParser(description = 'Imports a QNAP Notes Station archive into Joplin')
+        parser.add_argument('archive', nargs = '?', default = config.get('archive', ''), help = 'the .ns3 archive')
+        parser.add_argument('--token', default = config.get('token', ''), help = 'the Joplin Data API token')
+        parser.add_argument('--insertion', default = config.get('insertion-point', ''), help = 'title of the target notebook')
+        parser.add_argument('--memory-limit', type = int, default = config.get('memory-limit', 256 * 1024 * 1024), 
+                            help = 'ceiling for the bytes in flight')
+        parser.add_argument('--workers', type = int, default = config.get('workers', 4), help = 'threads per upload stage')
+        parser.add_argument('--processes', type = int, default = config.get('processes', 1), 
+                            help = 'worker processes, the notebooks are sharded among them')
+        parser.add_argument('--readers', type = int, default = config.get('readers') or None, 
+                            help = 'threads decompressing resources, default number of cores')
+        parser.add_argument('--cache', default = configured('conversion-cache'), help = 'path of the conversion cache')
+        parser.add_argument('--cache-limit', type = int, default = config.get('conversion-cache-limit', 256 * 1024 * 1024), 
+                            help = 'size cap of the conversion cache')
+        parser.add_argument('--database', help = 'Joplin profile folder to write into directly, Joplin must be closed')
+        parser.add_argument('--profile', default = config.get('profile') or None, 
+                            help = 'folder receiving pstats and collapsed stack files')
+        parser.add_argument('--profile-workers', action = 'store_true', default = config.get('profile-workers', False), 
+                            help = 'profiles every worker thread separately')
+        parser.add_argument('--plan', help = 'exports the import plan as json file')
+        parser.add_argument('--tag-journal', default = configured('tag-journal', './CacheFiles/TagJournal.jsonl'), 
+                            help = 'journal making the tag assignment resumable')
+        parser.add_argument('--resume-tags', action = 'store_true', help = 'resumes an interrupted tag assignment only')
+        parser.add_argument('--plan-only', action = 'store_true', help = 'scans the archive without importing')
+        parser.add_argument('--watch', help = 'folder watched for archives, each is synchronized incrementally')
+        parser.add_argument('--watch-interval', type = float, default = config.get('watch-interval', 2.0), 
+                            help = 'seconds between two polls of the watched folder')
+        parser.add_argument('--watch-retry', type = float, default = config.get('watch-retry', 60.0), 
+                            help = 'seconds after which a failed synchronization is repeated')
+        parser.add_argument('--watch-settle', type = float, default = config.get('watch-settle', 5.0), 
+                            help = 'seconds an archive must stay unchanged before it is taken')
+        parser.add_argument('--sync-state', default = configured('sync-state', './CacheFiles/SyncState.json'), 
+                            help = 'json file keeping what was synchronized from which archive')
+        args = parser.parse_args(argv)
+        if args.processes > 1 and args.database:
+            parser.error('--database cannot be combined with --processes')
+        if args.processes > 1 and args.watch:
+            parser.error('--watch cannot be combined with --processes')
+
+        args.archive = abspath(args.archive)
+        if args.database:
+            args.database = abspath(args.database)
+        if args.profile:
+            args.profile = abspath(args.profile)
+        if args.plan:
+            args.plan = abspath(args.plan)
+        if args.watch:
+            args.watch = abspath(args.watch)
+        if args.cache:
+            args.cache = abspath(args.cache)
+        args.sync_state = abspath(args.sync_state)
+        args.tag_journal = abspath(args.tag_journal)
+        
+        chdir(folder)
+        if not exists('LoggingFiles'):
+            mkdir('LoggingFiles')
+        
+        return cls(args).run()
+
+
+    def run(self):
+        '''
+        Runs the scan and, unless only the plan is requested, the import
+        @return: the exit code
+        '''
+        args = self.args
+        events = EventBus()
+        events.subscribe(self._refresh, 0.5)
+        options = dict(memory_limit = args.memory_limit, workers = args.workers, readers = args.readers, 
+                       cache = args.cache, cache_limit = args.cache_limit, 
+                       profile = args.profile, profile_workers = args.profile_workers, 
+                       tag_journal = args.tag_journal)
+        if args.processes > 1:
+            self.importer = ShardedImport(events, args.archive, args.token, args.insertion, args.processes, **options)
+        else:
+            self.importer = Importer(events, args.archive, args.token, args.insertion, 
+                                     database = args.database, **options)
+        if args.watch:
+            return self.watch()
+        
+        if args.resume_tags:
+            try:
+                self.importer.assign_tags()
+            finally:
+                self.importer.close()
+            return 1 if self.errors else 0
+        
+        plan = self.importer.scan()
+        if args.plan:
+            plan.save(args.plan)
+        if args.plan_only:
+            self.importer.close()
+            return 0
+        
+        try:
+            self.importer.import_it()
+        finally:
+            self.importer.close()
+        sys.stderr.write('\n')
+        return 1 if self.errors else 0
+
+
+    def watch(self):
+        '''
+        Synchronizes the archives dropped into the watched folder until interrupted
+        @return: the exit code
+        '''
+        args = self.args
+        watcher = Watcher(self.importer, args.watch, args.sync_state, args.watch_interval, args.watch_settle,
+                          args.watch_retry)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.stop()
+        finally:
+            self.importer.close()
+        sys.stderr.write('\n')
+        return 0
+
+
+    def _refresh(self, events):
+        '''
+        Redraws the progress bar, subscribed to the progress events twice a second
+        '''
+        self.errors += sum(1 for event in events if event.kind == Event.ERROR)
+        progress = self.importer.progress
+        if not progress:
+            return
+        
+        width = 40
+        done = int(progress.fraction() * width)
+        sys.stderr.write(f'\r[{"#" * done}{"." * (width - done)}] {progress.fraction():4.0%} {progress}, {self.errors} errors')
+        sys.stderr.flush()
+
+
+if __name__ == '__main__':
+    
+    sys.exit(Cli.main())
@@ -0,0 +1,121 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+'''
+from os.path import dirname, exists
+from os import makedirs
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class ConversionCache(object):
+    '''
+    Persistent cache of converted notes
+    Maps a hash of the raw note content and the converter version to the mark
+    down and the list of its resource references. The entries live in a SQLite
+    database, so several threads or processes can share it; the least recently
+    used entries are evicted when the size cap is exceeded.
+    '''
+    EVICTION_INTERVAL = 100                                                         # puts between two size checks
+
+    def __init__(self, path, limit, version):
+        '''
+        Constructor
+        @param path: path of the database file
+        @param limit: size cap in bytes for mark down and references together
+        @param version: version of the converter, part of every key
+        '''
+        self.path = path
+        self.limit = limit
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+        folder = dirname(path)
+        if folder and not exists(folder):
+            makedirs(folder, exist_ok = True)
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS entries '
+                       '(key TEXT PRIMARY KEY, markdown TEXT, refs TEXT, size INTEGER, used REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+
+
+    def key(self, content):
+        '''
+        Returns the cache key of raw note content
+        '''
+        return hashlib.sha256(f'{self.version}\0{content}'.encode('utf-8')).hexdigest()
+
+
+    def get(self, key):
+        '''
+        Looks up a converted note and marks it as recently used
+        @return: tuple (mark down, list of references) or None
+        '''
+        with self._connect() as db:
+            row = db.execute('SELECT markdown, refs FROM entries WHERE key = ?', (key,)).fetchone()
+            if row:
+                db.execute('UPDATE entries SET used = ? WHERE key = ?', (time.time(), key))
+
+        with self.lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return (row[0], json.loads(row[1])) if row else None
+
+
+    def put(self, key, markdown, refs):
+        '''
+        Stores a converted note
+        @param refs: list of resource references, must be json serializable
+        '''
+        refs = json.dumps(refs)
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+                       (key, markdown, refs, len(markdown) + len(refs), time.time()))
+
+        with self.lock:
+            self.puts += 1
+            evict = self.puts % ConversionCache.EVICTION_INTERVAL == 0
+        if evict:
+            self.evict()
+
+
+    def evict(self):
+        '''
+        Removes the least recently used entries until the size cap is met
+        '''
+        with self._connect() as db:
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            excess = total - self.limit
+            if excess <= 0:
+                return
+
+            keys = []
+            for key, size in db.execute('SELECT key, size FROM entries ORDER BY used'):
+                keys.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            db.executemany('DELETE FROM entries WHERE key = ?', keys)
+
+
+    def _connect(self):
+        '''
+        Returns the connection of the calling thread
+        '''
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(self.path, timeout = 30)
+            db.execute('PRAGMA journal_mode = WAL')                                 # readers do not block the writer
+            db.execute('PRAGMA synchronous = NORMAL')
+        return db
@@ -0,0 +1,115 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+'''
+import threading
+import time
+
+
+class Event(object):
+    '''
+    A progress event of the import
+    '''
+    FOLDER_CREATED = 'folder-created'
+    NOTE_CONVERTED = 'note-converted'
+    NOTE_UPLOADED = 'note-uploaded'
+    RESOURCE_UPLOADED = 'resource-uploaded'
+    RESOURCE_DEDUPLICATED = 'resource-deduplicated'
+    TAG_ASSIGNED = 'tag-assigned'
+    ERROR = 'error'
+
+    __slots__ = ('kind', 'name', 'count', 'bytes', 'time', 'error')
+
+    def __init__(self, kind, name, count, bytes_, error = None):
+        '''
+        Constructor
+        @param kind: one of the kind constants above
+        @param name: title of the folder, note, resource or tag
+        @param count: number of events of this kind so far, including this one
+        @param bytes_: size of the item, 0 if not applicable
+        @param error: the exception of an ERROR event
+        '''
+        self.kind = kind
+        self.name = name
+        self.count = count
+        self.bytes = bytes_
+        self.time = time.time()
+        self.error = error
+
+
+    def __repr__(self):
+        '''
+        Short representation for logging
+        '''
+        return f'Event({self.kind}, {self.name!r}, count={self.count}, bytes={self.bytes})'
+
+
+class EventBus(object):
+    '''
+    Collects the events published by the import threads and hands them to the
+    subscribers in the thread calling dispatch. Publishing only appends to a list,
+    so the import never waits for a subscriber.
+    '''
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+        self.events = []
+        self.counts = {}
+        self.bytes = {}
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+
+    def subscribe(self, callback, interval = 0.0):
+        '''
+        Registers a subscriber
+        @param callback: called with the list of events since its last call
+        @param interval: minimum seconds between two calls, the sampling rate
+        '''
+        self.subscribers.append(EventBus.Subscriber(callback, interval))
+
+
+    def publish(self, kind, name = '', bytes_ = 0, error = None):
+        '''
+        Publishes an event, may be called from any thread
+        '''
+        with self.lock:
+            count = self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.bytes[kind] = self.bytes.get(kind, 0) + bytes_
+            self.events.append(Event(kind, name, count, bytes_, error))
+
+
+    def dispatch(self, force = False):
+        '''
+        Hands the pending events to the subscribers whose interval has elapsed
+        Subscribers are called even without new events, so they can refresh
+        @param force: calls all subscribers regardless of their interval
+        '''
+        with self.lock:
+            events, self.events = self.events, []
+
+        now = time.time()
+        for subscriber in self.subscribers:
+            subscriber.pending.extend(events)
+            if force or now - subscriber.last >= subscriber.interval:
+                subscriber.last = now
+                pending, subscriber.pending = subscriber.pending, []
+                subscriber.callback(pending)
+
+
+    class Subscriber(object):
+        '''
+        A subscriber with its own sampling rate
+        '''
+
+        def __init__(self, callback, interval):
+            '''
+            Constructor
+            '''
+            self.callback = callback
+            self.interval = interval
+            self.last = 0.0
+            self.pending = []
@@ -22,6 +22,7 @@ from gui_ui import Ui_Dialog
 from stdout_redirector import StdoutRedirector
 from logging_factory import LoggingFactory
 from importer import Importer
+from events import EventBus
 
 
 class Gui(QDialog, Ui_Dialog):
@@ -40,6 +41,7 @@ class Gui(QDialog, Ui_Dialog):
         self.argv = argv
         
         self.path = '.'                                             # environ['PROJECT_LOC']
+        self.importer = None
         self._wire_handlers()
         self._readConfig()
 
@@ -198,14 +200,37 @@ class Gui(QDialog, Ui_Dialog):
             token = self.lineEditToken.text()
             insertion = self.lineEditInsertion.text()
             if archive and token:
-                importer = Importer(self._refresh_gui, archive, token, insertion)
-                importer.import_it()
+                self.progressBar.setValue(0)
+                events = EventBus()
+                events.subscribe(self._refresh_gui, 0.1)
+                self.importer = Importer(
+                    events, 
+                    archive, 
+                    token, 
+                    insertion, 
+                    memory_limit = self.config.get('memory-limit', 256 * 1024 * 1024), 
+                    workers = self.config.get('workers', 4), 
+                    readers = self.config.get('readers') or None, 
+                    cache = self.config.get('conversion-cache'), 
+                    cache_limit = self.config.get('conversion-cache-limit', 256 * 1024 * 1024), 
+                    profile = self.config.get('profile') or None, 
+                    profile_workers = self.config.get('profile-workers', False), 
+                    tag_journal = self.config.get('tag-journal', './CacheFiles/TagJournal.jsonl'))
+                try:
+                    self.importer.import_it()
+                finally:
+                    self.importer.close()
     
     
-    def _refresh_gui(self):
+    def _refresh_gui(self, events):
         '''
-        Refreshs the Gui
+        Refreshs the Gui, subscribed to the progress events
         '''
+        self.redirector.drain()
+        progress = self.importer.progress
+        if progress:
+            self.progressBar.setValue(int(progress.fraction() * 1000))
+            self.progressBar.setFormat(f'%p% - {progress}')
         self.app.processEvents()
 
         
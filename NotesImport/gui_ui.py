@@ -55,13 +55,18 @@ class Ui_Dialog(object):
         self.pushButtonGo = QtWidgets.QPushButton(Dialog)
         self.pushButtonGo.setObjectName("pushButtonGo")
         self.gridLayout.addWidget(self.pushButtonGo, 4, 1, 1, 1)
+        self.progressBar = QtWidgets.QProgressBar(Dialog)
+        self.progressBar.setMaximum(1000)
+        self.progressBar.setProperty("value", 0)
+        self.progressBar.setObjectName("progressBar")
+        self.gridLayout.addWidget(self.progressBar, 5, 0, 1, 3)
         self.textEditOutput = QtWidgets.QTextEdit(Dialog)
         font = QtGui.QFont()
         font.setFamily("Lucida Console")
         self.textEditOutput.setFont(font)
         self.textEditOutput.setReadOnly(True)
         self.textEditOutput.setObjectName("textEditOutput")
-        self.gridLayout.addWidget(self.textEditOutput, 5, 0, 1, 3)
+        self.gridLayout.addWidget(self.textEditOutput, 6, 0, 1, 3)
 
         self.retranslateUi(Dialog)
         QtCore.QMetaObject.connectSlotsByName(Dialog)
@@ -85,4 +90,5 @@ class Ui_Dialog(object):
         self.pushButtonArchive.setText(_translate("Dialog", "..."))
         self.pushButtonGo.setToolTip(_translate("Dialog", "<html><head/><body><p>Starts the import process. This may take a while. Progress information is stored in the text box below.</p></body></html>"))
         self.pushButtonGo.setText(_translate("Dialog", "Go"))
+        self.progressBar.setToolTip(_translate("Dialog", "<html><head/><body><p>Progress of the import with the estimated remaining time.</p></body></html>"))
         self.textEditOutput.setToolTip(_translate("Dialog", "<html><head/><body><p>Text box to display progress information and status info.</p></body></html>"))
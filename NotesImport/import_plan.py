@@ -0,0 +1,184 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+'''
+import json
+import threading
+import time
+
+
+class ImportPlan(object):
+    '''
+    Totals of an archive gathered before the import starts
+    Only data.json, the note files and the zip central directory are read,
+    resources are never decompressed
+    '''
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+        self.notebooks = 0
+        self.sections = 0
+        self.notes = 0
+        self.resources = 0
+        self.unique_resources = 0
+        self.resource_bytes = 0
+        self.unique_resource_bytes = 0
+        self.largest_resource_bytes = 0
+        self.tags = 0
+        self.tag_assignments = 0
+        self.footprint = 0
+        self.requests = 0
+
+
+    @classmethod
+    def scan(cls, qnap):
+        '''
+        Scans the archive
+        @param qnap: the Importer.Qnap instance giving access to the archive
+        @return: the plan
+        '''
+        plan = cls()
+        tags = set()
+
+        for book in qnap._get_structure():
+            plan.notebooks += 1
+            for section in book.sections:
+                plan.sections += 1
+                for note in section.notes:
+                    location = note.location
+                    note_file = json.loads(qnap._read_note(location).decode('utf-8'))
+                    names = { tag['tag_name'].lower() for tag in note_file['tag_list'] }
+                    tags.update(names)
+                    plan.notes += 1
+                    plan.tag_assignments += len(names)
+                    plan.footprint += qnap._get_footprint(location)
+
+        for (_, size), paths in qnap._get_blobs().items():
+            plan.resources += len(paths)
+            plan.unique_resources += 1
+            plan.resource_bytes += size * len(paths)
+            plan.unique_resource_bytes += size
+            plan.largest_resource_bytes = max(plan.largest_resource_bytes, size)
+
+        plan.tags = len(tags)
+        plan.requests = plan._estimate_requests()
+        return plan
+
+
+    @classmethod
+    def of_jobs(cls, jobs):
+        '''
+        Returns a plan covering only the given pipeline jobs
+        Used when a part of the archive is imported
+        '''
+        plan = cls()
+        plan.notes = len(jobs)
+        plan.footprint = sum(job.cost for job in jobs)
+        return plan
+
+
+    def _estimate_requests(self):
+        '''
+        Estimates the number of Data API requests of the import
+        - at least one listing per kind for the metadata mirror
+        - one POST per folder, note and unique resource
+        - one POST per tag of a note, one more per new tag
+        '''
+        return 3 + self.notebooks + self.sections + self.notes \
+            + self.unique_resources + self.tag_assignments + self.tags
+
+
+    def as_dict(self):
+        '''
+        Returns the plan as dictionary
+        '''
+        return dict(self.__dict__)
+
+
+    def save(self, path):
+        '''
+        Exports the plan as json file
+        @param path: path of the json file
+        '''
+        with open(path, 'w') as f:
+            json.dump(self.as_dict(), f, indent = 4)
+
+
+    def __str__(self):
+        '''
+        Returns a human readable summary
+        '''
+        return f'{self.notebooks} notebooks, {self.sections} sections, {self.notes} notes, ' \
+            f'{self.unique_resources}/{self.resources} unique resources ({self.unique_resource_bytes} bytes, ' \
+            f'largest {self.largest_resource_bytes}), {self.tags} tags, ~{self.requests} requests'
+
+
+class Progress(object):
+    '''
+    Progress of an import measured against its plan
+    Notes are weighted by their footprint, so large notes count accordingly
+    '''
+
+    def __init__(self, plan):
+        '''
+        Constructor
+        @param plan: the ImportPlan of the running import
+        '''
+        self.plan = plan
+        self.notes = 0
+        self.bytes = 0
+        self.start = time.time()
+        self.lock = threading.Lock()
+
+
+    def advance(self, cost):
+        '''
+        Records a finished note
+        @param cost: the footprint of the note
+        '''
+        with self.lock:
+            self.notes += 1
+            self.bytes += cost
+
+
+    def combine(self, parts):
+        '''
+        Sets the totals from the progress of several shards
+        @param parts: iterable of (notes, bytes) tuples
+        '''
+        parts = list(parts)
+        with self.lock:
+            self.notes = sum(notes for notes, _ in parts)
+            self.bytes = sum(bytes_ for _, bytes_ in parts)
+
+
+    def fraction(self):
+        '''
+        Returns the finished part of the import between 0 and 1
+        '''
+        if self.plan.footprint:
+            return min(1.0, self.bytes / self.plan.footprint)
+        return self.notes / self.plan.notes if self.plan.notes else 1.0
+
+
+    def eta(self):
+        '''
+        Returns the estimated remaining seconds or None if not yet known
+        '''
+        fraction = self.fraction()
+        if not fraction:
+            return None
+        elapsed = time.time() - self.start
+        return elapsed * (1 - fraction) / fraction
+
+
+    def __str__(self):
+        '''
+        Returns a short text like 42/100 notes, ETA 01:23
+        '''
+        eta = self.eta()
+        eta = '--:--' if eta is None else f'{int(eta) // 60:02d}:{int(eta) % 60:02d}'
+        return f'{self.notes}/{self.plan.notes} notes, ETA {eta}'
@@ -4,13 +4,25 @@ Created on 22.09.2021
 @author: juergen@habelt-jena.de
 '''
 from zipfile import ZipFile
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from os import cpu_count
 import json
 import requests
 from urllib import parse
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
+import threading
 import re
 
 from logging_factory import LoggingFactory
+from pipeline import Pipeline, Job
+from import_plan import ImportPlan, Progress
+from events import Event, EventBus
+from conversion_cache import ConversionCache
+from joplin_mirror import JoplinMirror
+from joplin_database import JoplinDatabase
+from model import Notebook, Node
+from profiling import Profiler
+from tag_journal import TagJournal
 
 
 class Importer(object):
@@ -19,18 +31,49 @@ class Importer(object):
     '''
     REGEX_QUOTES = re.compile(r'(?<!\\)\\"')
     REGEX_UML = re.compile(r'%([a-zA-Z0-9][a-zA-Z0-9])%([a-zA-Z0-9][a-zA-Z0-9])')
+    REGEX_PLACEHOLDER = re.compile('\0(\\d+)\0')
+    CONVERTER_VERSION = 2                                           # increment with every change of the generated mark down
 
-    def __init__(self, refresh, archive, token, insertion):
+    def __init__(self, events, archive, token, insertion, memory_limit = 256 * 1024 * 1024, workers = 4, 
+                 cache = None, cache_limit = 256 * 1024 * 1024, database = None, profile = None, profile_workers = False, 
+                 readers = None, tag_journal = './CacheFiles/TagJournal.jsonl'):
         '''
         Constructor
+        @param events: the EventBus receiving the progress events, None for a private one
+        @param memory_limit: ceiling for the bytes in flight in the import pipeline
+        @param workers: number of threads for conversion and note upload
+        @param cache: path of the conversion cache database, None to convert every note
+        @param cache_limit: size cap of the conversion cache in bytes
+        @param database: Joplin profile folder to write into directly instead of using the Data API
+        @param profile: folder receiving profiling output of the scan and import phases, None for no profiling
+        @param profile_workers: profiles every worker thread of the import separately
+        @param readers: number of threads decompressing resources, None for the number of cores
+        @param tag_journal: path of the journal making the tag assignment phase resumable
         '''
         path = '.'                                                  # environ['PROJECT_LOC']
         self.logger = LoggingFactory(path).getLogger(self)
 
-        self.refresh = refresh
+        self.events = events or EventBus()
         self.token = token
-        self.qnap = Importer.Qnap(self, archive)
-        self.joplin = Importer.Joplin(self, token, insertion)
+        self.memory_limit = memory_limit
+        self.workers = workers
+        self.resource_futures = {}                                  # (crc, size) -> future of the upload
+        self.uploads = ThreadPoolExecutor(workers, thread_name_prefix = 'resources')
+        self.lock = threading.Lock()
+        self.plan = None
+        self.progress = None
+        self.cache = ConversionCache(cache, cache_limit, Importer.CONVERTER_VERSION) if cache else None
+        self.profiler = Profiler(profile, profile_workers) if profile else None
+        self.journal = TagJournal(tag_journal)
+        self.tag_notes = {}                                         # tag name -> list of note ids
+        self.sync_notes = None                                      # note key -> [note id, digest, tags] while syncing
+        self.errors = 0                                             # notes failed in the last pipeline run
+        self.readers = readers or cpu_count() or 1
+        self.qnap = Importer.Qnap(self, archive, self.readers)
+        if database:
+            self.joplin = JoplinDatabase(self, database, insertion)                  # offline bulk load, Joplin closed
+        else:
+            self.joplin = Importer.Joplin(self, token, insertion)
 
 
     @contextmanager
@@ -45,49 +88,474 @@ class Importer(object):
             self.logger.exception('Exception during command execution')
         
         
+    def close(self):
+        '''
+        Releases the archive handles and the connections of the output backend
+        '''
+        self.uploads.shutdown(wait = True)
+        self.qnap._close()
+        self.joplin.close()
+        
+        
+    def open_archive(self, archive):
+        '''
+        Replaces the archive to import
+        The Joplin connections, the metadata mirror and the caches stay warm
+        @param archive: path of the new archive
+        '''
+        self.qnap._close()
+        self.qnap = Importer.Qnap(self, archive, self.readers)
+        self.plan = None
+        
+        
+    def scan(self):
+        '''
+        Scans the archive without decompressing resources
+        @return: the ImportPlan, also kept as attribute plan
+        '''
+        with self._profile('scan'):
+            self.plan = ImportPlan.scan(self.qnap)
+        self.logger.info(f'Import plan: {self.plan}')
+        return self.plan
+        
+        
     def import_it(self):
         '''
         Imports the archive
         - Extracts the relevant files from archive
         - Inserts them into Joplin by using the Joplin Data API 
+        The notes run through a pipeline of stages:
+        archive read -> decode -> convert -> resource upload -> note upload
+        Then the tags are assigned in a separate phase
+        '''
+        plan = self.plan or self.scan()                                                         # also groups duplicate resources
+        self.joplin._refresh()
+        with self._profile('import'):
+            self._import(plan)
+        with self._profile('tags'):
+            self.assign_tags(self.tag_notes)
+        self.logger.info(f'Successfully imported QNAP Notes Archive: {self.qnap.archive}')
+        
+        
+    def import_shard(self, notes, resources = None):
+        '''
+        Imports notes into folders created by a coordinator, see ShardedImport
+        The tags are only collected, the coordinator assigns them
+        @param notes: list of (note location, section folder id)
+        @param resources: dictionary (crc, size) -> Joplin resource id of resources put by the coordinator
+        @return: dictionary tag name -> list of note ids
+        '''
+        for key, id_ in (resources or {}).items():                                              # reused like own uploads
+            future = self.resource_futures[tuple(key)] = Future()
+            future.set_result(id_)
+        jobs = [self._job(location, sec_id) for location, sec_id in notes]
+        with self._profile('import'):
+            self._import(ImportPlan.of_jobs(jobs), jobs)
+        return self.tag_notes
+        
+        
+    def sync(self, state):
+        '''
+        Imports the notes which are new or changed since the last sync of the archive
+        Folders and notes of earlier syncs are taken from the state, changed notes
+        are updated in place. Notes are compared by CRC32 and size of their note file.
+        A note is identified by notebook, section and title, the archive has no stable note id.
+        ASSUMPTION: the folders and notes of earlier syncs still exist in Joplin
+        @param state: dictionary with 'folders' (path -> id) and 'notes' (note key -> [id, digest, tags]), updated
+        @return: number of notes imported or updated
+        @raise RuntimeError: if notes or tag assignments failed, the state keeps the notes which succeeded
+            and the tag journal the failed assignments, both are retried by the next sync
+        '''
+        folders = state.setdefault('folders', {})
+        self.sync_notes = state.setdefault('notes', {})
+        self.joplin._refresh()                                                                  # the importer may live for days
+        failed = 0
+        try:
+            insertion_id = self.joplin._get_insertion_id()
+            jobs = list(self._sync_jobs(insertion_id, self.qnap._get_structure(), folders))
+            if jobs:
+                with self._profile('import'):
+                    self._import(ImportPlan.of_jobs(jobs), jobs)
+            if jobs or self.journal.exists():                                                   # failed links of earlier syncs
+                with self._profile('tags'):
+                    failed = self.assign_tags(self.tag_notes if jobs else {})
+        finally:
+            self.sync_notes = None
+        
+        if jobs and self.errors:
+            raise RuntimeError(f'{self.errors} of {len(jobs)} notes failed to synchronize')
+        if failed:
+            raise RuntimeError(f'{failed} tag assignments failed to synchronize')
+        self.logger.info(f'Synchronized QNAP Notes Archive: {self.qnap.archive}, {len(jobs)} notes new or changed')
+        return len(jobs)
+        
+        
+    def assign_tags(self, mapping = None):
+        '''
+        Assigns the tags collected during note upload
+        Every tag is resolved or created once, then its notes are linked concurrently.
+        Each link is journaled, so an interrupted phase can be resumed on its own.
+        The unfinished links of an interrupted phase are merged into a new mapping.
+        @param mapping: dictionary tag name -> list of note ids, None to resume the journal
+        @return: number of failed assignments, they stay in the journal
+        '''
+        if mapping is None:
+            if not self.journal.exists():
+                self.logger.info(f'No interrupted tag assignment, nothing to resume: {self.journal.path}')
+                return 0
+            mapping, done = self.journal.resume()
+            self.logger.info(f'Resuming tag assignment, {len(done)} assignments done already')
+        else:
+            if self.journal.exists():
+                mapping = { name: list(note_ids) for name, note_ids in mapping.items() }
+                pending = 0
+                for name, note_ids in self.journal.pending().items():
+                    merged = mapping.setdefault(name, [])
+                    for note_id in note_ids:
+                        if note_id not in merged:
+                            merged.append(note_id)
+                            pending += 1
+                self.logger.warning(f'{pending} assignments of an interrupted tag assignment merged: {self.journal.path}')
+            self.journal.start(mapping)
+            done = set()
+        
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix = 'tags')
+        try:
+            futures = []
+            failed = 0
+            for name, note_ids in mapping.items():
+                note_ids = [note_id for note_id in note_ids if (name, note_id) not in done]
+                if not note_ids:
+                    continue
+                tag_id = self.joplin._get_tag_id(name)                                          # once per tag
+                if not tag_id:                                                                  # stays in the journal
+                    failed += len(note_ids)
+                    self.events.publish(Event.ERROR, name, error = ValueError(f'No tag id acquired for tag {name}'))
+                    continue
+                self.logger.info(f'--- tag: {name} ({len(note_ids)} notes)')
+                futures.extend(pool.submit(self._link_tag, tag_id, name, note_id) for note_id in note_ids)
+            
+            while futures:
+                finished, futures = wait(futures, timeout = 0.1)
+                for future in finished:
+                    if future.exception():
+                        failed += 1
+                        self.logger.error(f'Tag assignment failed: {future.exception()}')
+                        self.events.publish(Event.ERROR, 'tag', error = future.exception())
+                self.events.dispatch()
+            
+        except BaseException as _:
+            self.journal.close()
+            raise
+        
+        finally:
+            pool.shutdown(wait = True)
+            self.joplin._commit()
+            self.events.dispatch(force = True)
+        
+        if failed:
+            self.journal.close()
+            self.logger.warning(f'{failed} tag assignments failed, the phase can be resumed: {self.journal.path}')
+        else:
+            self.journal.finish()
+        return failed
+    
+    
+    def _link_tag(self, tag_id, name, note_id):
         '''
-        insertion_id = self.joplin._get_insertion_id()
-        archive_structure = self.qnap._get_structure()
-        self.logger.info(f'Inserting into: {self.joplin.insertion}')
+        Links a note to a tag and journals it
+        '''
+        self.joplin._link_tag(tag_id, note_id)
+        self.journal.record(name, note_id)
+        self.events.publish(Event.TAG_ASSIGNED, name)
+        
+        
+    def _import(self, plan, jobs = None):
+        '''
+        Runs the import pipeline
+        @param jobs: iterable of jobs, None to create the folders and import all notes of the archive
+        '''
+        self.progress = Progress(plan)
+        self.tag_notes = {}
+        self.errors = 0
+        if jobs is None:
+            insertion_id = self.joplin._get_insertion_id()
+            self.logger.info(f'Inserting into: {self.joplin.insertion}')
+            jobs = self._jobs(insertion_id, self.qnap._get_structure())
         
         # self._probe(insertion_id)
         # return
         
-        for book in archive_structure['notebooks']:                                             # all note books
-            nb_name = book['nb_name']
-            nb_data = self.joplin._put_folder(insertion_id, nb_name)                            # put it as folder
-            nb_id = nb_data['id']
-            self.logger.info(nb_name)
-            self.refresh()                                                                      # refreshes the GUI
-            
-            for section in book['sec_list']:                                                    # all sections in note book
-                sec_name = section['sec_name']
-                sec_data = self.joplin._put_folder(nb_id, sec_name)                             # put it as folder
-                sec_id = sec_data['id']
-                self.logger.info(f'- {sec_name}')
-                self.refresh()                                                                  # refreshes the GUI
-            
-                for note in section['note_list']:                                               # all notes in section
-                    location = note['note_location']
-                    note_file = self.qnap._get_note(location)
-                    note_name = note_file['note_name']
-                    note_content = note_file['content']
-                    md = self._convert_note(location, note_content)                             # convert the content to mark down
-                    resp = self.joplin._put_note(sec_id, note_name, md)                         # put the note
-                    self.logger.info(f'-- {note_name}')
-                    self.refresh()                                                              # refreshes the GUI
-        
-                    for tag in note_file['tag_list']:
-                        self.joplin._put_tag(resp['id'], tag['tag_name'])
-                        self.logger.info(f'--- tag: {tag["tag_name"]}')
-                        self.refresh()                                                              # refreshes the GUI
+        pipeline = Pipeline(self.logger, self.memory_limit, self.profiler)
+        pipeline.stage('read', self._read_stage) \
+                .stage('decode', self._decode_stage) \
+                .stage('convert', self._convert_stage, self.workers) \
+                .stage('resources', self._resources_stage, self.workers) \
+                .stage('upload', self._upload_stage, self.workers)
+        try:
+            pipeline.run(jobs, self.events.dispatch, done = self._done)
+        finally:
+            self.joplin._commit()
+        self.events.dispatch(force = True)
+        self.errors = pipeline.errors
         
-        self.logger.info(f'Successfully imported QNAP Notes Archive: {self.qnap.archive}')
+        self.logger.debug(f'Peak bytes in flight: {pipeline.budget.peak}')
+        if self.cache:
+            self.cache.evict()
+            self.logger.info(f'Conversion cache: {self.cache.hits} hits, {self.cache.misses} misses')
+        if pipeline.errors:
+            self.logger.warning(f'{pipeline.errors} notes failed to import')
+    
+    
+    def _profile(self, phase):
+        '''
+        Returns a context profiling the given phase if profiling is on
+        '''
+        return self.profiler.phase(phase) if self.profiler else nullcontext()
+    
+    
+    def _task(self):
+        '''
+        Returns a context profiling a task of a pool thread if profiling is on
+        '''
+        return self.profiler.task(threading.current_thread().name) if self.profiler else nullcontext()
+    
+    
+    def _jobs(self, insertion_id, archive_structure):
+        '''
+        Creates the folders and yields a job for every note
+        The cost of a job is estimated from the zip central directory
+        '''
+        for book in archive_structure:                                                          # all note books
+            for location, sec_id in self._create_folders(insertion_id, book):
+                yield self._job(location, sec_id)
+    
+    
+    def _sync_jobs(self, insertion_id, archive_structure, folders):
+        '''
+        Creates the missing folders and yields a job for every new or changed note
+        The note locations are positions and shift when notes are inserted, so the
+        notes are keyed by folder path and title, same titles are numbered.
+        @param folders: dictionary folder path -> id of earlier syncs, updated
+        '''
+        for book in archive_structure:
+            nb_id = self._sync_folder(folders, insertion_id, book.name, book.name)
+            for section in book.sections:
+                path = f'{book.name}/{section.name}'
+                sec_id = self._sync_folder(folders, nb_id, path, section.name)
+                titles = {}
+                for note in section.notes:
+                    location = note.location
+                    title = json.loads(self.qnap._read_note(location))['note_name']
+                    count = titles[title] = titles.get(title, 0) + 1
+                    key = f'{path}/{title}' if count == 1 else f'{path}/{title}#{count}'
+                    digest = self.qnap._get_digest(location)
+                    known = self.sync_notes.get(key)
+                    if known and known[1] == digest:                                            # unchanged
+                        continue
+                    if known:
+                        yield self._job(location, sec_id, known[0], digest, key, known[2])
+                    else:
+                        yield self._job(location, sec_id, None, digest, key)
+    
+    
+    def _sync_folder(self, folders, parent_id, path, title):
+        '''
+        Returns the id of a folder of an earlier sync or creates it
+        '''
+        id_ = folders.get(path)
+        if not id_:
+            id_ = folders[path] = self.joplin._put_folder(parent_id, title)['id']
+            self.logger.info(f'- {path}')
+            self.events.publish(Event.FOLDER_CREATED, title)
+        return id_
+    
+    
+    def _job(self, location, sec_id, note_id = None, digest = None, key = None, tags = ()):
+        '''
+        Creates the pipeline job of a note
+        @param note_id: id of the note to update, None for a new note
+        @param digest: digest of the note file, recorded in the sync state after upload
+        @param key: key of the note in the sync state, None if not syncing
+        @param tags: names of the tags of the note at the last sync
+        '''
+        return Job(self.qnap._get_footprint(location), location = location, sec_id = sec_id, 
+                   note_id = note_id, digest = digest, key = key, tags = tags)
+    
+    
+    def _create_folders(self, insertion_id, book):
+        '''
+        Creates the folders of a note book and its sections
+        @param insertion_id: id of the parent folder
+        @param book: the Notebook
+        @return: list of (note location, section folder id) of all notes in the note book
+        '''
+        notes = []
+        nb_data = self.joplin._put_folder(insertion_id, book.name)                              # put it as folder
+        nb_id = nb_data['id']
+        self.logger.info(book.name)
+        self.events.publish(Event.FOLDER_CREATED, book.name)
+        
+        for section in book.sections:                                                           # all sections in note book
+            sec_data = self.joplin._put_folder(nb_id, section.name)                             # put it as folder
+            sec_id = sec_data['id']
+            self.logger.info(f'- {section.name}')
+            self.events.publish(Event.FOLDER_CREATED, section.name)
+            notes.extend((note.location, sec_id) for note in section.notes)                     # all notes in section
+        
+        return notes
+    
+    
+    def _read_stage(self, job):
+        '''
+        Pipeline stage: reads the raw note file from the archive
+        The resources of the note are decompressed meanwhile by the reader pool
+        '''
+        job.prefetched = self.qnap._prefetch(job.location, self.resource_futures)               # uploaded or uploading
+        job.raw = self.qnap._read_note(job.location)
+    
+    
+    def _decode_stage(self, job):
+        '''
+        Pipeline stage: decodes the raw note file
+        '''
+        job.note_file = self.qnap._decode_note(job.raw)
+        job.raw = None
+    
+    
+    def _convert_stage(self, job):
+        '''
+        Pipeline stage: converts the content to mark down with resource placeholders
+        Unchanged notes are taken from the conversion cache
+        '''
+        content = job.note_file['content']
+        key = self.cache.key(content) if self.cache else None
+        cached = self.cache.get(key) if key else None
+        
+        if cached:
+            job.md, job.refs = cached
+        else:
+            job.md, job.refs = self._convert_note(content)
+            if key:
+                self.cache.put(key, job.md, job.refs)
+            
+        self.events.publish(Event.NOTE_CONVERTED, job.note_file['note_name'], len(job.md))
+    
+    
+    def _resources_stage(self, job):
+        '''
+        Pipeline stage: puts the resources of the note concurrently and patches their links
+        '''
+        job.md = self._resolve(job.location, job.md, job.refs)
+        job.refs = None
+    
+    
+    def _upload_stage(self, job):
+        '''
+        Pipeline stage: puts the note
+        '''
+        note_name = job.note_file['note_name']
+        if job.note_id:
+            self.joplin._update_note(job.note_id, job.sec_id, note_name, job.md)                # changed since last sync
+        else:
+            resp = self.joplin._put_note(job.sec_id, note_name, job.md)
+            job.note_id = resp['id']
+        self.logger.info(f'-- {note_name}')
+        self.events.publish(Event.NOTE_UPLOADED, note_name, len(job.md))
+        job.md = None
+        self._collect_tags(job)
+        if job.key:
+            tags = sorted({tag['tag_name'].lower() for tag in job.note_file['tag_list']})
+            for name in job.tags:
+                if name not in tags:                                                            # removed since last sync
+                    self._unlink_tag(name, job.note_id)
+            with self.lock:
+                self.sync_notes[job.key] = [job.note_id, job.digest, tags]
+    
+    
+    def _collect_tags(self, job):
+        '''
+        Records the tags of an uploaded note for the tag assignment phase
+        '''
+        with self.lock:
+            for tag in job.note_file['tag_list']:
+                note_ids = self.tag_notes.setdefault(tag['tag_name'].lower(), [])
+                if job.note_id not in note_ids:
+                    note_ids.append(job.note_id)
+    
+    
+    def _unlink_tag(self, name, note_id):
+        '''
+        Removes a tag from a note, a tag which no longer exists is ignored
+        '''
+        tag = self.joplin._get_tag(name)
+        if tag:
+            self.joplin._unlink_tag(tag[0]['id'], note_id)
+            self.logger.info(f'--- untagged: {name}')
+    
+    
+    def _resolve(self, location, md, refs):
+        '''
+        Replaces the resource placeholders of converted mark down by Joplin resource links
+        Each unique blob (by CRC32 and size) is read and posted only once, the
+        uploads run concurrently in the upload pool
+        @param location: note location
+        @param md: the mark down with placeholders
+        @param refs: list of [kind, src, title], indexed by placeholder
+        @return: the final mark down
+        '''
+        futures = []
+        for kind, src, title in refs:
+            key = self.qnap._get_resource_key(location, kind, src)
+            with self.lock:
+                future = self.resource_futures.get(key)
+                if future is None:
+                    future = self.resource_futures[key] = self.uploads.submit(
+                        self._put_resource, location, kind, src, title, key)
+                else:
+                    self.logger.debug(f'Duplicate resource reused: {title}')
+                    self.events.publish(Event.RESOURCE_DEDUPLICATED, title, key[1])
+            futures.append(future)
+        
+        ids = [future.result() for future in futures]
+        return Importer.REGEX_PLACEHOLDER.sub(lambda match: ids[int(match.group(1))], md)
+    
+    
+    def _put_resource(self, location, kind, src, title, key):
+        '''
+        Puts a resource of the archive into Joplin
+        A failed upload is forgotten, so the next reference tries again
+        @param location: note location
+        @param kind: kind of resource, maybe 'image' or 'attachment'
+        @param src: id of the resource, filename inside the archive
+        @param title: title of the resource
+        @param key: the key (CRC32, size) of the resource
+        @return: the Joplin resource id
+        '''
+        try:
+            meta_data = { 'title': title }
+            with self._task():
+                content = self.qnap._get_resource(location, kind, src)                          # first get the attachment from Qnap
+                resp = self.joplin._put_resource(meta_data, content)
+            id_ = resp['id']
+            self.events.publish(Event.RESOURCE_UPLOADED, title, len(content))
+            return id_
+        
+        except BaseException as _:
+            with self.lock:
+                self.resource_futures.pop(key, None)
+            raise
+    
+    
+    def _done(self, job):
+        '''
+        Called for every note leaving the pipeline
+        '''
+        self.progress.advance(job.cost)
+        self.qnap._discard(getattr(job, 'prefetched', ()))
+        error = getattr(job, 'error', None)
+        if error:
+            self.events.publish(Event.ERROR, job.location, error = error)
     
     
     def _probe(self, parent_id):
@@ -104,7 +572,8 @@ class Importer(object):
         note_file = self.qnap._get_note(location)
         note_name = note_file['note_name']
         note_content = note_file['note_content']
-        md = self._convert_note(location, note_content)
+        md, refs = self._convert_note(note_content)
+        md = self._resolve(location, md, refs)
         resp = self.joplin._put_note(parent_id, note_name, md)
         
         for tag in note_file['tag_list']:
@@ -118,20 +587,31 @@ class Importer(object):
         Sub class responsible for QNAP archive extraction 
         '''
         
-        def __init__(self, parent, archive):
+        def __init__(self, parent, archive, readers):
             '''
             Constructor
+            @param readers: number of threads decompressing resources in parallel
             '''
             self.parent = parent
             self.archive = archive
+            self.local = threading.local()                                      # every thread reads with its own handle
+            self.handles = []
+            self.lock = threading.Lock()
+            self.pool = ThreadPoolExecutor(readers, thread_name_prefix = 'reader')
+            self.prefetched = {}                                                # (crc, size) -> future of the content
+            self.infos = None
+            self.blobs = None
+            self.footprints = None
+            self.resources = None
         
         
         def _get_structure(self):
             '''
             Gets the structure file from the QNAP archive
+            @return: tuple of Notebook
             '''
             json_data = self._unzip('data.json')
-            return json.loads(json_data.decode('utf-8'))
+            return Notebook.build_all(json.loads(json_data.decode('utf-8')))
             
             
         def _get_note(self, location):
@@ -139,7 +619,22 @@ class Importer(object):
             Gets a note file from the QNAP archive (noteInfo.json)
             @param location: note location
             '''
-            json_data = self._unzip(f'{location}/noteInfo.json')
+            return self._decode_note(self._read_note(location))
+            
+            
+        def _read_note(self, location):
+            '''
+            Reads the raw note file from the QNAP archive (noteInfo.json)
+            @param location: note location
+            '''
+            return self._unzip(f'{location}/noteInfo.json')
+            
+            
+        def _decode_note(self, json_data):
+            '''
+            Decodes a raw note file
+            @param json_data: content of noteInfo.json (bytes)
+            '''
             json_data = json_data.decode('utf-8')
             
             json_data = json_data.replace('\\\\', '~#~')                            # special handling for double backslashes
@@ -156,16 +651,169 @@ class Importer(object):
             @param kind: kind of resource, maybe 'image' or 'attachment'
             @param id_: id of the resource, filename inside the archive
             '''
+            key = self._get_resource_key(location, kind, id_)
+            with self.lock:
+                future = self.prefetched.pop(key, None)
+                
+            if future:                                                          # decompressed by the reader pool
+                return future.result()
             return self._unzip(f'{location}/{kind}/{id_}')
         
         
+        def _prefetch(self, location, skip):
+            '''
+            Starts decompressing the resources of a note in the reader pool
+            Each blob is decompressed once, whichever note reads it first gets it
+            @param location: note location
+            @param skip: container of keys (crc, size) not needed any more
+            @return: list of the keys submitted
+            '''
+            if self.resources is None:
+                self._scan()
+                
+            keys = []
+            for path, key in self.resources.get(location, ()):
+                if key in skip:
+                    continue
+                with self.lock:
+                    if key not in self.prefetched:
+                        self.prefetched[key] = self.pool.submit(self._prefetched, path)
+                        keys.append(key)
+            return keys
+        
+        
+        def _prefetched(self, path):
+            '''
+            Decompresses a resource in the reader pool
+            '''
+            with self.parent._task():
+                return self._unzip(path)
+        
+        
+        def _discard(self, keys):
+            '''
+            Drops prefetched resources which were not read
+            @param keys: the keys returned by _prefetch
+            '''
+            with self.lock:
+                for key in keys:
+                    future = self.prefetched.pop(key, None)
+                    if future:
+                        future.cancel()
+        
+        
+        def _get_resource_key(self, location, kind, id_):
+            '''
+            Gets the identity of a resource file from the zip central directory
+            Resources with equal content share the same key
+            @param location: note location
+            @param kind: kind of resource, maybe 'image' or 'attachment'
+            @param id_: id of the resource, filename inside the archive
+            @return: tuple (CRC32, uncompressed size)
+            '''
+            if self.infos is None:
+                self._scan()
+            info = self.infos[f'{location}/{kind}/{id_}']
+            return (info.CRC, info.file_size)
+        
+        
+        def _get_digest(self, location):
+            '''
+            Gets a digest of the note file from the zip central directory
+            @param location: note location
+            @return: string of CRC32 and size
+            '''
+            if self.infos is None:
+                self._scan()
+            info = self.infos[f'{location}/noteInfo.json']
+            return f'{info.CRC:08x}-{info.file_size}'
+        
+        
+        def _get_blobs(self):
+            '''
+            Groups all image and attachment entries of the archive by (CRC32, size)
+            Only the ZipInfo records are used, nothing is decompressed
+            @return: dictionary (CRC32, size) -> list of entry paths
+            '''
+            if self.blobs is None:
+                self._scan()
+            return self.blobs
+        
+        
+        def _get_footprint(self, location):
+            '''
+            Estimates the bytes a note occupies while being imported
+            The note file counts threefold (raw, decoded, converted), resources once
+            @param location: note location
+            '''
+            if self.footprints is None:
+                self._scan()
+            return self.footprints.get(location, 0)
+        
+        
+        def _scan(self):
+            '''
+            Scans the zip central directory for resources and note sizes
+            '''
+            self.infos = {}
+            self.blobs = {}
+            self.footprints = {}
+            self.resources = {}
+            for info in self._open().infolist():
+                self.infos[info.filename] = info
+                parts = info.filename.split('/')
+                if parts[-1] == 'noteInfo.json':
+                    location = '/'.join(parts[:-1])
+                    size = 3 * info.file_size
+                elif parts[-2:-1] == ['image'] or parts[-2:-1] == ['attachment']:
+                    location = '/'.join(parts[:-2])
+                    size = info.file_size
+                    self.blobs.setdefault((info.CRC, info.file_size), []).append(info.filename)
+                    self.resources.setdefault(location, []).append((info.filename, (info.CRC, info.file_size)))
+                else:
+                    continue
+                self.footprints[location] = self.footprints.get(location, 0) + size
+        
+        
+        def _open(self):
+            '''
+            Opens the archive once per thread, the handle is kept for subsequent reads
+            A shared handle would serialize all reads
+            '''
+            zip_file = getattr(self.local, 'zip_file', None)
+            if zip_file is None:
+                zip_file = self.local.zip_file = ZipFile(self.archive)
+                with self.lock:
+                    for thread, handle in self.handles:                         # handles of finished threads are closed
+                        if not thread.is_alive():
+                            handle.close()
+                    self.handles = [(thread, handle) for thread, handle in self.handles if thread.is_alive()]
+                    self.handles.append((threading.current_thread(), zip_file))
+            return zip_file
+        
+        
+        def _close(self):
+            '''
+            Stops the reader pool and closes all handles
+            '''
+            with self.lock:
+                for future in self.prefetched.values():
+                    future.cancel()
+                self.prefetched = {}
+            self.pool.shutdown(wait = True)
+            
+            with self.lock:
+                for _, handle in self.handles:
+                    handle.close()
+                self.handles = []
+            self.local = threading.local()
+        
+        
         def _unzip(self, path):
             '''
             Un-zip a file from archive into memory
             '''
-            zf = ZipFile(self.archive)
-            data = zf.read(path)
-            return data
+            return self._open().read(path)
     
     
     class Joplin(object):
@@ -180,36 +828,55 @@ class Importer(object):
             self.parent = parent
             self.token = token
             self.insertion = insertion
+            
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize = parent.workers + 2)
+            self.session = requests.Session()                                   # connections are kept alive and shared
+            self.session.mount('http://', adapter)
+            self.mirror = JoplinMirror(self)                                    # answers all lookups in memory
+        
+        
+        def close(self):
+            '''
+            Closes the connections
+            '''
+            self.session.close()
+            
+            
+        def _commit(self):
+            '''
+            Nothing to do, every request is applied immediately
+            '''
+            pass
+        
+        
+        def _refresh(self):
+            '''
+            Pulls the changes made in Joplin since the last refresh into the metadata mirror
+            '''
+            count = self.mirror.refresh()
+            self.parent.logger.debug(f'Metadata mirror refreshed: {count} items')
         
     
         def _get_insertion_id(self):
             '''
-            Gets the Insertion Id with a GET request
+            Gets the Insertion Id from the metadata mirror
             '''
-            return self._search(self.insertion, 'folder')[0]['id']
+            return self.mirror.folders(self.insertion)[0]['id']
             
         
         def _get_tag(self, name):
             '''
-            Gets the tag with name with a GET request
+            Gets the tag with name from the metadata mirror
             '''
-            name = name.lower()
-            return self._search(name, 'tag')
+            tag = self.mirror.tag(name)
+            return [tag] if tag else []
         
         
         def _get_resource(self, title):
             '''
             Gets the resource record(s) (json) with the given title
             '''
-            lst = []
-            query = { 'fields': 'id,size', 'token': self.token }
-    
-            for item in self._search(title, 'resource'):                            # here we get all resources with the given title
-                url = f'http://localhost:41184/resources/{item["id"]}'
-                resp = self._get(url, query)                                        # and we extract the required info (id, size)
-                lst.append(resp)
-                
-            return lst
+            return self.mirror.resources(title)                                 # each with the required info (id, size)
             
             
         def _put_folder(self, parent_id, title):
@@ -219,7 +886,10 @@ class Importer(object):
             url = 'http://localhost:41184/folders'
             query = { 'token': self.token }
             data = { 'title': title, 'parent_id': parent_id }
-            return self._post(url, query, data)
+            resp = self._post(url, query, data)
+            if 'id' in resp:
+                self.mirror.add('folders', resp)
+            return resp
             
             
         def _put_note(self, parent_id, title, content):
@@ -232,6 +902,16 @@ class Importer(object):
             return self._post(url, query, data)
         
         
+        def _update_note(self, note_id, parent_id, title, content):
+            '''
+            Replaces folder, title and body of an existing note with a PUT request
+            '''
+            url = f'http://localhost:41184/notes/{note_id}'
+            query = { 'token': self.token }
+            data = { 'title': title, 'body': content, 'parent_id': parent_id }
+            return self._put(url, query, data)
+        
+        
         def _put_resource(self, meta_data, content):
             '''
             Puts a resource into Joplin
@@ -243,27 +923,53 @@ class Importer(object):
         
         def _put_tag(self, note_id, name):
             '''
-            Creates a tag and assigns it to the given id's note
-            (Problem: does it duplicate existing tags?)
+            Creates a tag if needed and assigns it to the given id's note
+            '''
+            id_ = self._get_tag_id(name)
+            if id_:
+                return self._link_tag(id_, note_id)
+            return None
+        
+        
+        def _get_tag_id(self, name):
+            '''
+            Gets the id of the tag with name, the tag is created if it does not exist
             '''
             json = self._get_tag(name)                                                  # look at existing tags
-            query = { 'token': self.token }
     
             if len(json):
                 json = json[0]                                                          # take the existing tag
             else:
                 url = 'http://localhost:41184/tags'
+                query = { 'token': self.token }
                 data = { 'title': name }
                 json = self._post(url, query, data)                                     # create a new tag
+                if 'id' in json:
+                    self.mirror.add('tags', json)
     
             id_ = json.get('id')
-            if id_:
-                url = f'http://localhost:41184/tags/{id_}/notes'
-                data = { 'id': note_id }
-                return self._post(url, query, data)                                     # assign a note to it
-            
-            self.parent.logger.warning(f'No tag id acquired for tag {name}: {json}')
-            return None
+            if not id_:
+                self.parent.logger.warning(f'No tag id acquired for tag {name}: {json}')
+            return id_
+        
+        
+        def _link_tag(self, tag_id, note_id):
+            '''
+            Assigns the given id's note to a tag
+            '''
+            url = f'http://localhost:41184/tags/{tag_id}/notes'
+            query = { 'token': self.token }
+            data = { 'id': note_id }
+            return self._post(url, query, data, check = True)                           # assign a note to it
+        
+        
+        def _unlink_tag(self, tag_id, note_id):
+            '''
+            Removes the given id's note from a tag
+            '''
+            url = f'http://localhost:41184/tags/{tag_id}/notes/{note_id}'
+            query = { 'token': self.token }
+            self._delete(url, query)
     
     
         def _search(self, identifier, kind):
@@ -282,22 +988,55 @@ class Importer(object):
             query_str = parse.urlencode(query)
             query_str = self._decode_unicode(query_str)
             
-            resp = requests.get(url + '?' + query_str)
+            resp = self.session.get(url + '?' + query_str)
             return resp.json()
         
         
-        def _post(self, url, query, data):
+        def _post(self, url, query, data, check = False):
             '''
             POST request
+            @param check: raises on an error response instead of returning the error json
             '''    
             query_str = parse.urlencode(query)
             data_str = json.dumps(data)
             headers = {'content-type': 'application/json', 'Accept-Charset': 'UTF-8'}
             
-            resp = requests.post(url + '?' + query_str, data = data_str, headers = headers)
+            resp = self.session.post(url + '?' + query_str, data = data_str, headers = headers)
+            if check:
+                self._check(resp)
             return resp.json()
         
         
+        def _check(self, resp):
+            '''
+            Raises for an error response of the Data API, the url is left out as it contains the token
+            '''
+            if resp.status_code >= 300:
+                raise requests.HTTPError(f'Data API error {resp.status_code}: {resp.text[:200]}', response = resp)
+        
+        
+        def _put(self, url, query, data):
+            '''
+            PUT request
+            '''
+            query_str = parse.urlencode(query)
+            data_str = json.dumps(data)
+            headers = {'content-type': 'application/json', 'Accept-Charset': 'UTF-8'}
+            
+            resp = self.session.put(url + '?' + query_str, data = data_str, headers = headers)
+            self._check(resp)
+            return resp.json()
+        
+        
+        def _delete(self, url, query):
+            '''
+            DELETE request
+            '''
+            query_str = parse.urlencode(query)
+            resp = self.session.delete(url + '?' + query_str)
+            self._check(resp)
+        
+        
         def _post_resource(self, url, query, meta_data, content):
             '''
             POST request for resources
@@ -313,8 +1052,11 @@ class Importer(object):
             meta_data_encoded = json.dumps(meta_data).encode('utf-8')
             data = (('props', (None, meta_data_encoded)), ('data', (title, content)))
             
-            resp = requests.post(url + '?' + query_str, files = data)                   # otherwise add the resource
-            return resp.json()
+            resp = self.session.post(url + '?' + query_str, files = data)                  # otherwise add the resource
+            resp = resp.json()
+            if 'id' in resp:
+                self.mirror.add('resources', dict(resp, size = len(content)))
+            return resp
     
     
         def _decode_unicode(self, strg):
@@ -324,12 +1066,15 @@ class Importer(object):
             return parse.unquote(strg)
     
         
-    def _convert_note(self, location, content):
+    def _convert_note(self, content):
         '''
         Converts a QNAP Note in mark-down format
-        @param location: location of the note
+        Conversion is pure, resources are only referenced by placeholders
         @param content: the content of a note (raw)
+        @return: tuple (mark down with placeholders, list of [kind, src, title] per placeholder)
         '''
+        refs = []
+        
         def convert_content(content, quotation = 0):
             '''
             Converts common content
@@ -337,23 +1082,23 @@ class Importer(object):
             md = ''
             for item in content:
                 item_md = ''
-                if item['type'] == 'table':
+                if item.type == 'table':
                     item_md = convert_table(item)
-                if item['type'] == 'paragraph':
+                if item.type == 'paragraph':
                     item_md = convert_para(item)
-                if item['type'] == 'heading':
+                if item.type == 'heading':
                     item_md = convert_heading(item)
-                if item['type'] == 'check_list':
+                if item.type == 'check_list':
                     item_md = convert_check_list(item)
-                if item['type'] == 'bullet_list':
+                if item.type == 'bullet_list':
                     item_md = convert_list(item, '- ')
-                if item['type'] == 'ordered_list':
+                if item.type == 'ordered_list':
                     item_md = convert_list(item, '1. ')
-                if item['type'] == 'horizontal_rule':
+                if item.type == 'horizontal_rule':
                     item_md = '---\n'
-                if item['type'] == 'blockquote':
-                    item_md = convert_content(item['content'], quotation + 1)
-                if item['type'] == 'code_block':
+                if item.type == 'blockquote':
+                    item_md = convert_content(item.content, quotation + 1)
+                if item.type == 'code_block':
                     item_md = convert_code(item)
                     
                 md += '>' * quotation + item_md + '\n'
@@ -369,13 +1114,13 @@ class Importer(object):
             first = True
             rows = []
             
-            for row in table['content']:
-                assert row['type'] == 'table_row'
+            for row in table.content:
+                assert row.type == 'table_row'
                 cells = ['']
                 
-                for cell in row['content']:
-                    assert cell['type'] == 'table_cell'
-                    for para in cell['content']:
+                for cell in row.content:
+                    assert cell.type == 'table_cell'
+                    for para in cell.content:
                         cells.append(convert_para(para))
                         
                 cells.append('')
@@ -383,7 +1128,7 @@ class Importer(object):
                 rows.append(row_md)
                 
                 if first:
-                    divider.extend(['-'] * len(row['content']))
+                    divider.extend(['-'] * len(row.content))
                     divider.append('')
                     divider_md = '|'.join(divider)
                     rows.append(divider_md)
@@ -396,9 +1141,9 @@ class Importer(object):
             '''
             Converts a heading
             '''
-            assert heading['type'] == 'heading'
-            level = heading['attrs']['level']
-            txt = convert_text(heading['content'][0])
+            assert heading.type == 'heading'
+            level = heading.attrs['level']
+            txt = convert_text(heading.content[0])
             return '#' * level + ' ' + txt
     
     
@@ -406,12 +1151,12 @@ class Importer(object):
             '''
             Converts a check list
             '''
-            assert check_list['type'] == 'check_list'
+            assert check_list.type == 'check_list'
             md = ''
-            for item in check_list['content']:
-                checked = 'x' if item['attrs']['checked'] else ' '
+            for item in check_list.content:
+                checked = 'x' if item.attrs['checked'] else ' '
                 txt = ''
-                for para in item['content']:
+                for para in item.content:
                     txt += convert_para(para)
                     
                 md += '\t' * level + f'- [{checked}] ' + txt + '\n'
@@ -424,17 +1169,17 @@ class Importer(object):
             Converts a list (bullet or ordered)
             '''
             md = ''
-            for item in list_['content']:
-                for nested in item['content']:                              # assumed to be 1 item inside list_item
-                    if nested['type'] == 'paragraph':
+            for item in list_.content:
+                for nested in item.content:                                 # assumed to be 1 item inside list_item
+                    if nested.type == 'paragraph':
                         txt = convert_para(nested)
                         md += '\t' * level + pattern + txt + '\n'
                         
-                    if nested['type'] == 'bullet_list':
+                    if nested.type == 'bullet_list':
                         md += convert_list(nested, '- ', level + 1)
-                    if nested['type'] == 'ordered_list':
+                    if nested.type == 'ordered_list':
                         md += convert_list(nested, '1. ', level + 1)
-                    if nested['type'] == 'check_list':
+                    if nested.type == 'check_list':
                         md += convert_check_list(nested, level + 1)
                         
             return md
@@ -444,18 +1189,18 @@ class Importer(object):
             '''
             Converts a paragraph
             '''
-            assert para['type'] == 'paragraph'
+            assert para.type == 'paragraph'
             md = ''
-            for item in para.get('content', ''):
+            for item in para.content:
                 if not item:
                     continue
-                if item['type'] == 'text':
+                if item.type == 'text':
                     md += convert_text(item)
-                if item['type'] == 'file':
+                if item.type == 'file':
                     md += convert_file(item)
-                if item['type'] == 'image':
+                if item.type == 'image':
                     md += convert_file(item, 'image')
-                if item['type'] == 'hard_break':
+                if item.type == 'hard_break':
                     md += '<br/>'
             
             return md
@@ -465,12 +1210,12 @@ class Importer(object):
             '''
             Converts a code block
             '''
-            assert code['type'] == 'code_block'
+            assert code.type == 'code_block'
             md = ''
-            for item in code.get('content', ''):
+            for item in code.content:
                 if not item:
                     continue
-                if item['type'] == 'text':
+                if item.type == 'text':
                     md += convert_text(item)
             
             return '```\n' + md + '```'
@@ -480,20 +1225,20 @@ class Importer(object):
             '''
             Converts text
             '''
-            pure_text = text['text']
-            marks = text.get('marks', [])
+            pure_text = text.text
+            marks = text.marks
             marks_string = ''
             for mark in marks:
-                if mark['type'] == 'em':
+                if mark.type == 'em':
                     marks_string += '*'
-                if mark['type'] == 'strong':
+                if mark.type == 'strong':
                     marks_string += '**'
-                if mark['type'] == 'superscript':
+                if mark.type == 'superscript':
                     marks_string += '^'
-                if mark['type'] == 'subscript':
+                if mark.type == 'subscript':
                     marks_string += '~'
-                if mark['type'] == 'link':
-                    href = mark['attrs']['href']
+                if mark.type == 'link':
+                    href = mark.attrs['href']
                     pure_text = f'[{pure_text}]({href})'
             
             return marks_string + pure_text + marks_string
@@ -501,18 +1246,17 @@ class Importer(object):
         
         def convert_file(file, kind = 'attachment'):
             '''
-            Converts a file entry and posts the file
+            Converts a file entry into a link with a placeholder for the resource id
             '''
-            src = file['attrs']['src'].split('/')
+            src = file.attrs['src'].split('/')
             src = src[-1]
-            title = file['attrs']['title']
-            meta_data = { 'title': title }
-            content = self.qnap._get_resource(location, kind, src)                      # first get the attachment from Qnap
-
-            resp = self.joplin._put_resource(meta_data, content)            
+            title = file.attrs['title']
+            placeholder = f'\0{len(refs)}\0'                                             # patched by _resolve
+            refs.append([kind, src, title])
+            
             sign = '' if kind == 'attachment' else '!'
             
-            return f'{sign}[{title}](:/{resp["id"]})'                                   # finally return the md
+            return f'{sign}[{title}](:/{placeholder})'                                  # finally return the md
             
 
         #content = content.replace(r'\\"', '~#~').replace(r'\"', '"').replace('~#~', r'\"')
@@ -521,10 +1265,10 @@ class Importer(object):
         #    self.logger.warning('There were double backslashes')
         content = content.replace(r'\"', '"')
         content = content.replace('~#~', '\\')                                          # can stem from Qnap._get_note
-        content_data = json.loads(content)                                              # this is then a dictionary
-        md = convert_content(content_data['content'])
+        root = Node.build(json.loads(content))                                          # this is then a tree of nodes
+        md = convert_content(root.content)
     
-        return md
+        return md, refs
 
 
 if __name__ == '__main__':
@@ -0,0 +1,284 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+
+ASSUMPTION: Joplin is closed while the import writes into its profile
+'''
+from os.path import join, splitext, exists
+from os import makedirs
+import mimetypes
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class JoplinDatabase(object):
+    '''
+    Output backend writing straight into the database.sqlite of a Joplin profile
+    Offers the same methods as Importer.Joplin. All writes go through a few
+    prepared statements inside large transactions; resource files are stored
+    in the resources folder of the profile.
+    '''
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS folders (id TEXT PRIMARY KEY, title TEXT NOT NULL DEFAULT "",
+            created_time INT NOT NULL, updated_time INT NOT NULL, user_created_time INT NOT NULL DEFAULT 0,
+            user_updated_time INT NOT NULL DEFAULT 0, parent_id TEXT NOT NULL DEFAULT "");
+        CREATE TABLE IF NOT EXISTS notes (id TEXT PRIMARY KEY, parent_id TEXT NOT NULL DEFAULT "",
+            title TEXT NOT NULL DEFAULT "", body TEXT NOT NULL DEFAULT "", created_time INT NOT NULL,
+            updated_time INT NOT NULL, user_created_time INT NOT NULL DEFAULT 0,
+            user_updated_time INT NOT NULL DEFAULT 0, markup_language INT NOT NULL DEFAULT 1);
+        CREATE TABLE IF NOT EXISTS tags (id TEXT PRIMARY KEY, title TEXT NOT NULL DEFAULT "",
+            created_time INT NOT NULL, updated_time INT NOT NULL, user_created_time INT NOT NULL DEFAULT 0,
+            user_updated_time INT NOT NULL DEFAULT 0, parent_id TEXT NOT NULL DEFAULT "");
+        CREATE TABLE IF NOT EXISTS note_tags (id TEXT PRIMARY KEY, note_id TEXT NOT NULL, tag_id TEXT NOT NULL,
+            created_time INT NOT NULL, updated_time INT NOT NULL, user_created_time INT NOT NULL DEFAULT 0,
+            user_updated_time INT NOT NULL DEFAULT 0);
+        CREATE TABLE IF NOT EXISTS resources (id TEXT PRIMARY KEY, title TEXT NOT NULL DEFAULT "",
+            mime TEXT NOT NULL, filename TEXT NOT NULL DEFAULT "", created_time INT NOT NULL,
+            updated_time INT NOT NULL, user_created_time INT NOT NULL DEFAULT 0,
+            user_updated_time INT NOT NULL DEFAULT 0, file_extension TEXT NOT NULL DEFAULT "",
+            size INT NOT NULL DEFAULT -1);
+        CREATE TABLE IF NOT EXISTS resource_local_states (id INTEGER PRIMARY KEY, resource_id TEXT NOT NULL,
+            fetch_status INT NOT NULL DEFAULT 2, fetch_error TEXT NOT NULL DEFAULT "");
+        '''                                                                         # the subset of Joplin's schema written here
+    FETCH_STATUS_DONE = 2                                                           # resource is available locally
+
+    INSERT_FOLDER = 'INSERT INTO folders (id, title, parent_id, created_time, updated_time, ' \
+        'user_created_time, user_updated_time) VALUES (?, ?, ?, ?, ?, ?, ?)'
+    INSERT_NOTE = 'INSERT INTO notes (id, title, body, parent_id, created_time, updated_time, ' \
+        'user_created_time, user_updated_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+    UPDATE_NOTE = 'UPDATE notes SET parent_id = ?, title = ?, body = ?, updated_time = ?, user_updated_time = ? ' \
+        'WHERE id = ?'
+    INSERT_TAG = 'INSERT INTO tags (id, title, created_time, updated_time, ' \
+        'user_created_time, user_updated_time) VALUES (?, ?, ?, ?, ?, ?)'
+    SELECT_NOTE_TAG = 'SELECT 1 FROM note_tags WHERE note_id = ? AND tag_id = ?'
+    INSERT_NOTE_TAG = 'INSERT INTO note_tags (id, note_id, tag_id, created_time, updated_time, ' \
+        'user_created_time, user_updated_time) VALUES (?, ?, ?, ?, ?, ?, ?)'
+    DELETE_NOTE_TAG = 'DELETE FROM note_tags WHERE note_id = ? AND tag_id = ?'
+    INSERT_RESOURCE = 'INSERT INTO resources (id, title, mime, filename, file_extension, size, created_time, ' \
+        'updated_time, user_created_time, user_updated_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+    INSERT_LOCAL_STATE = 'INSERT INTO resource_local_states (resource_id, fetch_status) VALUES (?, ?)'
+
+    def __init__(self, parent, profile, insertion, batch = 5000):
+        '''
+        Constructor
+        @param parent: the Importer
+        @param profile: the Joplin profile folder containing database.sqlite
+        @param insertion: title of the folder where to insert
+        @param batch: number of statements per transaction
+        '''
+        self.parent = parent
+        self.insertion = insertion
+        self.batch = batch
+        self.pending = 0
+        self.lock = threading.Lock()
+
+        self.resource_folder = join(profile, 'resources')
+        if not exists(self.resource_folder):
+            makedirs(self.resource_folder)
+
+        self.db = sqlite3.connect(join(profile, 'database.sqlite'), isolation_level = None, check_same_thread = False)
+        self.tags = { title.lower(): id_ for id_, title in self.db.execute('SELECT id, title FROM tags') }
+        self.db.execute('BEGIN')
+
+
+    @classmethod
+    def create_schema(cls, profile):
+        '''
+        Creates a profile database with the tables written by this backend
+        Used for dry runs and testing without a Joplin installation
+        @param profile: the profile folder
+        '''
+        if not exists(profile):
+            makedirs(profile)
+        db = sqlite3.connect(join(profile, 'database.sqlite'))
+        db.executescript(cls.SCHEMA)
+        db.close()
+
+
+    def _get_insertion_id(self):
+        '''
+        Gets the Insertion Id
+        '''
+        with self.lock:
+            return self.db.execute('SELECT id FROM folders WHERE title = ?', (self.insertion,)).fetchone()[0]
+
+
+    def _get_tag(self, name):
+        '''
+        Gets the tag with name
+        '''
+        with self.lock:
+            id_ = self.tags.get(name.lower())
+        return [{ 'id': id_, 'title': name.lower() }] if id_ else []
+
+
+    def _get_resource(self, title):
+        '''
+        Gets the resource record(s) with the given title
+        '''
+        with self.lock:
+            rows = self.db.execute('SELECT id, size FROM resources WHERE title = ?', (title,)).fetchall()
+        return [{ 'id': id_, 'size': size } for id_, size in rows]
+
+
+    def _put_folder(self, parent_id, title):
+        '''
+        Puts a folder (notebook) entry
+        '''
+        id_ = self._new_id()
+        now = self._now()
+        self._execute(JoplinDatabase.INSERT_FOLDER, (id_, title, parent_id, now, now, now, now))
+        return { 'id': id_, 'title': title, 'parent_id': parent_id }
+
+
+    def _put_note(self, parent_id, title, content):
+        '''
+        Puts a Mark-down note
+        '''
+        id_ = self._new_id()
+        now = self._now()
+        self._execute(JoplinDatabase.INSERT_NOTE, (id_, title, content, parent_id, now, now, now, now))
+        return { 'id': id_, 'title': title, 'parent_id': parent_id }
+
+
+    def _update_note(self, note_id, parent_id, title, content):
+        '''
+        Replaces folder, title and body of an existing note
+        '''
+        now = self._now()
+        if not self._execute(JoplinDatabase.UPDATE_NOTE, (parent_id, title, content, now, now, note_id)).rowcount:
+            raise LookupError(f'Note {note_id} does not exist')
+        return { 'id': note_id, 'title': title, 'parent_id': parent_id }
+
+
+    def _put_resource(self, meta_data, content):
+        '''
+        Puts a resource, an existing one with same title and size is reused
+        '''
+        title = meta_data['title']
+        for item in self._get_resource(title):                                      # does the resource exist?
+            if item['size'] == len(content):                                        # (title and size must agree)
+                self.parent.logger.debug(f'Existing resource detected: {title}')
+                return item
+
+        id_ = self._new_id()
+        now = self._now()
+        extension = splitext(title)[1][1 : ].lower()
+        mime = mimetypes.guess_type(title)[0] or 'application/octet-stream'
+        file_name = f'{id_}.{extension}' if extension else id_
+
+        with open(join(self.resource_folder, file_name), 'wb') as f:              # outside the lock
+            f.write(content)
+
+        with self.lock:
+            self.db.execute(JoplinDatabase.INSERT_RESOURCE,
+                            (id_, title, mime, '', extension, len(content), now, now, now, now))
+            self.db.execute(JoplinDatabase.INSERT_LOCAL_STATE, (id_, JoplinDatabase.FETCH_STATUS_DONE))
+            self._count(2)
+        return { 'id': id_, 'title': title, 'size': len(content) }
+
+
+    def _put_tag(self, note_id, name):
+        '''
+        Creates a tag if needed and assigns it to the given id's note
+        '''
+        return self._link_tag(self._get_tag_id(name), note_id)
+
+
+    def _get_tag_id(self, name):
+        '''
+        Gets the id of the tag with name, the tag is created if it does not exist
+        '''
+        now = self._now()
+        with self.lock:
+            tag_id = self.tags.get(name.lower())
+            if not tag_id:
+                tag_id = self.tags[name.lower()] = self._new_id()
+                self.db.execute(JoplinDatabase.INSERT_TAG, (tag_id, name.lower(), now, now, now, now))
+                self._count(1)
+        return tag_id
+
+
+    def _link_tag(self, tag_id, note_id):
+        '''
+        Assigns the given id's note to a tag, an existing assignment is kept
+        '''
+        now = self._now()
+        with self.lock:
+            if not self.db.execute(JoplinDatabase.SELECT_NOTE_TAG, (note_id, tag_id)).fetchone():
+                self.db.execute(JoplinDatabase.INSERT_NOTE_TAG, (self._new_id(), note_id, tag_id, now, now, now, now))
+                self._count(1)
+        return { 'id': note_id }
+
+
+    def _unlink_tag(self, tag_id, note_id):
+        '''
+        Removes the given id's note from a tag
+        '''
+        self._execute(JoplinDatabase.DELETE_NOTE_TAG, (note_id, tag_id))
+
+
+    def _commit(self):
+        '''
+        Commits the running transaction
+        '''
+        with self.lock:
+            self.db.execute('COMMIT')
+            self.db.execute('BEGIN')
+            self.pending = 0
+
+
+    def _refresh(self):
+        '''
+        Reloads the tags, everything else is read from the database anyway
+        '''
+        with self.lock:
+            self.tags = { title.lower(): id_ for id_, title in self.db.execute('SELECT id, title FROM tags') }
+
+
+    def close(self):
+        '''
+        Commits the last transaction and closes the database
+        '''
+        with self.lock:
+            self.db.execute('COMMIT')
+            self.db.close()
+
+
+    def _execute(self, statement, parameters):
+        '''
+        Executes a prepared statement inside the running transaction
+        @return: the cursor
+        '''
+        with self.lock:
+            cursor = self.db.execute(statement, parameters)
+            self._count(1)
+        return cursor
+
+
+    def _count(self, statements):
+        '''
+        Commits the transaction after batch statements, must be called with lock held
+        '''
+        self.pending += statements
+        if self.pending >= self.batch:
+            self.db.execute('COMMIT')
+            self.db.execute('BEGIN')
+            self.pending = 0
+
+
+    def _new_id(self):
+        '''
+        Returns a new Joplin id
+        '''
+        return uuid.uuid4().hex
+
+
+    def _now(self):
+        '''
+        Returns the current time in Joplin's unit (milliseconds)
+        '''
+        return int(time.time() * 1000)
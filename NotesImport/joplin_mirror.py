@@ -0,0 +1,129 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+'''
+import threading
+
+
+class JoplinMirror(object):
+    '''
+    In-memory mirror of the Joplin folders, tags and resources
+    The metadata is pulled through the paginated list endpoints of the Data API
+    requesting only the needed fields. Later refreshes stop at the first item not
+    updated since the previous one. Items created by the importer are added directly.
+    '''
+    FIELDS = {
+        'folders': 'id,title,parent_id,updated_time',
+        'tags': 'id,title,updated_time',
+        'resources': 'id,title,size,updated_time' }
+    PAGE_SIZE = 100                                                                 # maximum of the Data API
+
+    def __init__(self, joplin):
+        '''
+        Constructor
+        @param joplin: the Importer.Joplin instance performing the requests
+        '''
+        self.joplin = joplin
+        self.items = { kind: {} for kind in JoplinMirror.FIELDS }                   # kind -> id -> item
+        self.titles = { kind: {} for kind in JoplinMirror.FIELDS }                  # kind -> title -> list of items
+        self.synced = { kind: 0 for kind in JoplinMirror.FIELDS }                   # kind -> newest updated_time
+        self.loaded = False
+        self.lock = threading.RLock()
+
+
+    def refresh(self):
+        '''
+        Pulls the items updated since the last refresh
+        @return: number of items pulled
+        '''
+        with self.lock:
+            count = 0
+            for kind in JoplinMirror.FIELDS:
+                count += self._pull(kind)
+
+            self.loaded = True
+            return count
+
+
+    def folders(self, title):
+        '''
+        Returns the folders with the given title
+        '''
+        return self._lookup('folders', title)
+
+
+    def tag(self, name):
+        '''
+        Returns the tag with the given name (case insensitive) or None
+        '''
+        tags = self._lookup('tags', name.lower())
+        return tags[0] if tags else None
+
+
+    def resources(self, title):
+        '''
+        Returns the resources with the given title, each with id and size
+        '''
+        return self._lookup('resources', title)
+
+
+    def add(self, kind, item):
+        '''
+        Adds an item created by the importer
+        @param kind: 'folders', 'tags' or 'resources'
+        @param item: the item as returned by the POST request
+        '''
+        with self.lock:
+            previous = self.items[kind].get(item['id'])
+            if previous:
+                self.titles[kind][self._title(kind, previous)].remove(previous)
+            self.items[kind][item['id']] = item
+            self.titles[kind].setdefault(self._title(kind, item), []).append(item)
+
+
+    def _lookup(self, kind, title):
+        '''
+        Looks up items by title, loads the mirror on first use
+        '''
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    self.refresh()
+
+        with self.lock:
+            return list(self.titles[kind].get(title, []))
+
+
+    def _pull(self, kind):
+        '''
+        Pulls the pages of one kind, newest first, until an item known already is reached
+        '''
+        url = f'http://localhost:41184/{kind}'
+        synced = self.synced[kind]
+        page = 1
+        count = 0
+
+        while True:
+            query = { 'fields': JoplinMirror.FIELDS[kind], 'order_by': 'updated_time', 'order_dir': 'DESC',
+                      'limit': JoplinMirror.PAGE_SIZE, 'page': page, 'token': self.joplin.token }
+            content = self.joplin._get(url, query)
+
+            for item in content['items']:
+                if item['updated_time'] < synced:                                   # older items are mirrored already
+                    return count
+                self.synced[kind] = max(self.synced[kind], item['updated_time'])
+                self.add(kind, item)
+                count += 1
+
+            if not content.get('has_more'):
+                return count
+            page += 1
+
+
+    def _title(self, kind, item):
+        '''
+        Returns the lookup title of an item, tags are case insensitive
+        '''
+        title = item.get('title', '')
+        return title.lower() if kind == 'tags' else title
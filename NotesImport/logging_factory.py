@@ -9,6 +9,8 @@ __copyright__ = u'2019, Jürgen Habelt <juergen@habelt-jena.de>'
 __docformat__ = 'restructuredtext en'
 
 
+import threading
+
 from logging_instance_json import LoggingInstance
 
 
@@ -18,6 +20,7 @@ class LoggingFactory(object):
     '''
 
     _singleton = None
+    _lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         '''
@@ -25,8 +28,14 @@ class LoggingFactory(object):
         same instance.
         TODO: thello_worldif this works, when we derive different subclasses from it
         '''
-        if not LoggingFactory._singleton:
-            LoggingFactory._singleton = object.__new__(LoggingInstance)
-            LoggingFactory._singleton.__init__(*args, **kwargs)
+        singleton = LoggingFactory._singleton
+        if singleton is not None:                                                   # fast path after the first call
+            return singleton
+        
+        with LoggingFactory._lock:                                                  # workers may construct concurrently
+            if not LoggingFactory._singleton:
+                singleton = object.__new__(LoggingInstance)
+                singleton.__init__(*args, **kwargs)
+                LoggingFactory._singleton = singleton
         
         return LoggingFactory._singleton
@@ -9,9 +9,10 @@ Created on 02.07.2018
 @author: Jürgen Habelt
 '''
 
-from os.path import join
+from os.path import join, abspath
 import logging.config
 import json, re
+import threading
 
 
 class LoggingInstance(object):
@@ -19,31 +20,36 @@ class LoggingInstance(object):
     Supports logging, maintains all logger instances
     '''
     
+    _types = {}                                                                     # class -> logger name
+    
     @classmethod
     def type(cls, obj):
         '''
         Returns the somehow modified class name of an object
+        The name is computed once per class
         @param obj: the logging object instance
         @return: the class name to be used as logger name
         '''
-        tp = str(type(obj))
-        dottedName = re.match(r".*?'(.*?)'>", tp).group(1) 
-        return dottedName.split('.')[-1]
+        tp = type(obj)
+        name = cls._types.get(tp)
+        if name is None:
+            dottedName = re.match(r".*?'(.*?)'>", str(tp)).group(1) 
+            name = cls._types[tp] = dottedName.split('.')[-1]
+        return name
 
 
     def __init__(self, project_path = '.'):
         '''
         Constructor
+        The configuration is loaded lazily with the first logger
         '''
         if 'loggers' in self.__dict__:
             return
         
         self.loggers = {}
-        json_location = join(project_path, 'ConfigFiles', 'Logging.json')
-        
-        with open(json_location, 'r') as f:
-            dic = json.load(f)
-            logging.config.dictConfig(dic)
+        self.json_location = abspath(join(project_path, 'ConfigFiles', 'Logging.json'))    # immune to a later chdir
+        self.configured = False
+        self.lock = threading.Lock()
 
 
     def getLogger(self, name = 'raw'):
@@ -51,21 +57,37 @@ class LoggingInstance(object):
         Instantiates a logger with given name and additional console handler
         @param name: Can be name (string) or object
         '''
-        if len(self.loggers) == 0:                                                  # at the begin of each session do a roll-over
-            logger = logging.getLogger('raw')
-            for handler in logger.handlers:
-                if isinstance(handler, logging.handlers.TimedRotatingFileHandler):
-                    pass
-                    #handler.doRollover()
-        
         if not isinstance(name, str):
             name = LoggingInstance.type(name)
         
-        if name not in self.loggers:
-            logger = logging.getLogger(name)
-            self.loggers[name] = logger
+        logger = self.loggers.get(name)
+        if logger is None:
+            if not self.configured:
+                self._configure()
+            logger = self.loggers[name] = logging.getLogger(name)
         
-        return self.loggers[name]
+        return logger
+
+
+    def _configure(self):
+        '''
+        Loads the logging configuration, once per process
+        '''
+        with self.lock:
+            if self.configured:
+                return
+            
+            with open(self.json_location, 'r') as f:
+                dic = json.load(f)
+                logging.config.dictConfig(dic)
+            
+            logger = logging.getLogger('raw')                                       # at the begin of each session do a roll-over
+            for handler in logger.handlers:
+                if isinstance(handler, logging.handlers.TimedRotatingFileHandler):
+                    pass
+                    #handler.doRollover()
+            
+            self.configured = True
 
     
     def shutdown(self):
@@ -0,0 +1,134 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+
+Compact model of a QNAP Notes Station archive built from the parsed json.
+All classes use __slots__, repeated strings (node types, mark names, attribute
+keys) are interned, so large archives keep a small memory footprint.
+'''
+from sys import intern
+
+
+EMPTY = {}                                                                          # shared by all nodes without attributes
+
+
+class Notebook(object):
+    '''
+    A notebook of the archive structure (data.json)
+    '''
+    __slots__ = ('name', 'sections')
+
+    def __init__(self, name, sections):
+        '''
+        Constructor
+        @param name: the notebook name
+        @param sections: tuple of Section
+        '''
+        self.name = name
+        self.sections = sections
+
+
+    @classmethod
+    def build_all(cls, structure):
+        '''
+        Builds the notebooks of the parsed data.json
+        @return: tuple of Notebook
+        '''
+        return tuple(cls(book['nb_name'], tuple(Section.build(section) for section in book['sec_list']))
+                     for book in structure['notebooks'])
+
+
+class Section(object):
+    '''
+    A section of a notebook
+    '''
+    __slots__ = ('name', 'notes')
+
+    def __init__(self, name, notes):
+        '''
+        Constructor
+        @param name: the section name
+        @param notes: tuple of NoteRef
+        '''
+        self.name = name
+        self.notes = notes
+
+
+    @classmethod
+    def build(cls, section):
+        '''
+        Builds a section of the parsed data.json
+        '''
+        return cls(section['sec_name'], tuple(NoteRef(note['note_location']) for note in section['note_list']))
+
+
+class NoteRef(object):
+    '''
+    Reference to a note inside the archive
+    '''
+    __slots__ = ('location',)
+
+    def __init__(self, location):
+        '''
+        Constructor
+        @param location: the note location, the folder of noteInfo.json
+        '''
+        self.location = location
+
+
+class Mark(object):
+    '''
+    A mark of a text node like em, strong or link
+    '''
+    __slots__ = ('type', 'attrs')
+
+    def __init__(self, type_, attrs):
+        '''
+        Constructor
+        '''
+        self.type = type_
+        self.attrs = attrs
+
+
+class Node(object):
+    '''
+    A node of a note tree (doc, paragraph, text, table, ...)
+    '''
+    __slots__ = ('type', 'attrs', 'content', 'text', 'marks')
+
+    def __init__(self, type_, attrs = EMPTY, content = (), text = None, marks = ()):
+        '''
+        Constructor
+        @param type_: the interned node type
+        @param attrs: dictionary of attributes
+        @param content: tuple of child nodes, may contain None for empty entries
+        @param text: the text of text nodes
+        @param marks: tuple of Mark
+        '''
+        self.type = type_
+        self.attrs = attrs
+        self.content = content
+        self.text = text
+        self.marks = marks
+
+
+    @classmethod
+    def build(cls, data):
+        '''
+        Builds a node tree from the parsed note content
+        @param data: a dictionary of the parsed json, may be None or empty
+        @return: the Node or None
+        '''
+        if not data:
+            return None
+
+        attrs = data.get('attrs')
+        content = data.get('content')
+        marks = data.get('marks')
+        return cls(
+            intern(data['type']),
+            { intern(key): value for key, value in attrs.items() } if attrs else EMPTY,
+            tuple(cls.build(item) for item in content) if content else (),
+            data.get('text'),
+            tuple(Mark(intern(mark['type']), mark.get('attrs') or EMPTY) for mark in marks) if marks else ())
@@ -0,0 +1,238 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+'''
+from contextlib import nullcontext
+import threading
+from queue import Queue
+
+
+class Job(object):
+    '''
+    A unit of work travelling through the stages of a pipeline
+    Stages store their results as attributes of the job
+    '''
+
+    def __init__(self, cost, **kwargs):
+        '''
+        Constructor
+        @param cost: estimated number of bytes the job holds while in flight
+        '''
+        self.cost = cost
+        self.__dict__.update(kwargs)
+
+
+class MemoryBudget(object):
+    '''
+    Counts the bytes in flight against a single memory ceiling
+    '''
+
+    def __init__(self, limit):
+        '''
+        Constructor
+        @param limit: the memory ceiling in bytes
+        '''
+        self.limit = limit
+        self.in_flight = 0
+        self.peak = 0
+        self.condition = threading.Condition()
+
+
+    def acquire(self, size, cancelled):
+        '''
+        Blocks until size bytes fit under the ceiling
+        A job larger than the ceiling is admitted when nothing else is in flight
+        @param size: the number of bytes
+        @param cancelled: callable telling whether waiting should be given up
+        @return: True if the bytes were acquired
+        '''
+        with self.condition:
+            while self.in_flight and self.in_flight + size > self.limit:
+                if cancelled():
+                    return False
+                self.condition.wait(0.5)
+
+            self.in_flight += size
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+
+    def release(self, size):
+        '''
+        Gives back size bytes
+        '''
+        with self.condition:
+            self.in_flight -= size
+            self.condition.notify_all()
+
+
+class Pipeline(object):
+    '''
+    A chain of stages connected by queues, every stage served by its own threads
+    Jobs are admitted against the memory budget with their estimated cost and
+    release it when they leave the last stage. The bytes waiting in all queues
+    together can therefore not exceed the ceiling.
+    '''
+
+    def __init__(self, logger, limit, profiler = None):
+        '''
+        Constructor
+        @param logger: the logger to report failing jobs
+        @param limit: the memory ceiling in bytes
+        @param profiler: optional Profiler, its worker method wraps every worker thread
+        '''
+        self.logger = logger
+        self.profiler = profiler
+        self.budget = MemoryBudget(limit)
+        self.stages = []
+        self.errors = 0
+        self.fatal = None
+        self.lock = threading.Lock()
+
+
+    def stage(self, name, func, workers = 1):
+        '''
+        Appends a stage
+        @param name: name of the stage used in error messages
+        @param func: callable processing a job in place
+        @param workers: number of threads serving the stage
+        @return: the pipeline itself
+        '''
+        self.stages.append((name, func, workers))
+        return self
+
+
+    def run(self, source, idle = None, interval = 0.1, done = None):
+        '''
+        Runs all jobs of source through the stages
+        The calling thread only waits and invokes idle periodically
+        @param source: iterable of jobs, iterated in a feeder thread
+        @param idle: callable invoked in the calling thread while waiting
+        @param interval: seconds between two idle calls
+        @param done: callable invoked with every job leaving the pipeline, failed or not
+        '''
+        self.done = done
+        self.queues = [Queue() for _ in self.stages]
+        self.alive = [workers for _, _, workers in self.stages]
+        threads = [threading.Thread(target = self._feed, args = (source,), name = 'feed', daemon = True)]
+        for index, (name, _, workers) in enumerate(self.stages):
+            threads.extend(threading.Thread(target = self._work, args = (index,), name = f'{name}-{n}', daemon = True)
+                           for n in range(workers))
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(interval)
+                if idle:
+                    idle()
+
+        if self.fatal:
+            raise self.fatal
+
+
+    def _feed(self, source):
+        '''
+        Admits the jobs of the source against the memory budget
+        The first stage gets its end marks whatever happens
+        '''
+        try:
+            context = self.profiler.worker('feed') if self.profiler else nullcontext()
+            with context:
+                self._admit(source)
+
+        except BaseException as e:
+            self._fail('feed', e)
+
+        finally:
+            for _ in range(self.stages[0][2]):
+                self.queues[0].put(None)
+
+
+    def _admit(self, source):
+        '''
+        Puts the jobs of the source into the first queue
+        '''
+        for job in source:
+            if self.fatal or not self.budget.acquire(job.cost, lambda: self.fatal):
+                break
+            self.queues[0].put(job)
+
+
+    def _work(self, index):
+        '''
+        Serves one stage until its input is exhausted
+        A failure outside the stage function stops the run, the end marks are passed on anyway
+        '''
+        try:
+            context = self.profiler.worker(threading.current_thread().name) if self.profiler else nullcontext()
+            with context:
+                self._serve(index)
+
+        except BaseException as e:
+            self._fail(threading.current_thread().name, e)
+
+        finally:
+            self._leave(index)
+
+
+    def _fail(self, name, error):
+        '''
+        Records a fatal error, run raises the first one
+        '''
+        self.logger.exception(f'Pipeline thread {name} failed')
+        with self.lock:
+            if not self.fatal:
+                self.fatal = error
+
+
+    def _serve(self, index):
+        '''
+        Processes the jobs of a stage
+        '''
+        name, func, _ = self.stages[index]
+        inbox = self.queues[index]
+        last = index + 1 == len(self.stages)
+
+        while True:
+            job = inbox.get()
+            if job is None:
+                break
+
+            try:
+                func(job)
+            except BaseException as e:
+                self.logger.exception(f'Stage {name} failed')
+                job.error = e
+                with self.lock:
+                    self.errors += 1
+                self._finish(job)
+                continue
+
+            if last:
+                self._finish(job)
+            else:
+                self.queues[index + 1].put(job)
+
+
+    def _leave(self, index):
+        '''
+        Counts a finished worker of a stage, the last one passes the end on
+        '''
+        with self.lock:
+            self.alive[index] -= 1
+            finished = self.alive[index] == 0
+
+        if finished and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1][2]):
+                self.queues[index + 1].put(None)
+
+
+    def _finish(self, job):
+        '''
+        Lets a job leave the pipeline
+        '''
+        self.budget.release(job.cost)
+        if self.done:
+            self.done(job)
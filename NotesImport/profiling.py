@@ -0,0 +1,219 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+'''
+from os.path import join, exists, basename
+from os import makedirs
+from contextlib import contextmanager
+from collections import Counter
+import cProfile
+import sys
+import threading
+
+from logging_factory import LoggingFactory
+
+
+class Profiler(object):
+    '''
+    Profiles the phases of an import
+    Every phase writes a pstats file of the profiled threads and a file of
+    collapsed stacks sampled from all threads, which flame graph tools
+    (flamegraph.pl, speedscope) can render. The logged summary is taken from
+    the samples, the own samples of every leaf frame over all threads.
+    '''
+    WAITING = ('(threading.py:', '(queue.py:', '(thread.py:')                     # leaf frames of blocked threads
+
+    def __init__(self, folder, per_worker = False, top = 20, interval = 0.005):
+        '''
+        Constructor
+        @param folder: folder receiving the output files
+        @param per_worker: profiles every pipeline worker and pool thread with its own pstats file
+        @param top: number of functions in the logged summary
+        @param interval: seconds between two stack samples
+        '''
+        self.logger = LoggingFactory('.').getLogger(self)
+        self.folder = folder
+        self.per_worker = per_worker
+        self.top = top
+        self.interval = interval
+        self.phase_name = None
+        self.task_profiles = {}                                                     # pool thread name -> Profile
+        self.lock = threading.Lock()
+
+        if not exists(folder):
+            makedirs(folder)
+
+
+    @contextmanager
+    def phase(self, name):
+        '''
+        Profiles the calling thread and samples the stacks of all threads
+        @param name: name of the phase, used for the file names
+        '''
+        self.phase_name = name
+        self.task_profiles = {}
+        sampler = Profiler.Sampler(self.interval)
+        profile = cProfile.Profile()
+
+        sampler.start()
+        profile.enable()
+        try:
+            yield self
+
+        finally:
+            profile.disable()
+            sampler.stop()
+
+            profile.dump_stats(join(self.folder, f'{name}.pstats'))
+            for thread, task_profile in self.task_profiles.items():
+                task_profile.dump_stats(join(self.folder, f'{name}-{thread}.pstats'))
+            sampler.save(join(self.folder, f'{name}.collapsed'))
+            self._summarize(name, sampler)
+            self.phase_name = None
+
+
+    @contextmanager
+    def worker(self, name):
+        '''
+        Profiles a worker thread of the running phase, does nothing unless per worker profiling is on
+        @param name: name of the worker
+        '''
+        if not self.per_worker or not self.phase_name:
+            yield self
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:                                                     # Python 3.12+: one profiler per process
+            self._single(e)
+            yield self
+            return
+
+        try:
+            yield self
+
+        finally:
+            profile.disable()
+            profile.dump_stats(join(self.folder, f'{self.phase_name}-{name}.pstats'))
+
+
+    @contextmanager
+    def task(self, name):
+        '''
+        Profiles a task of a pool thread of the running phase, does nothing unless per worker profiling is on
+        The tasks of a thread add up in one profile, its pstats file is written when the phase ends
+        @param name: name of the pool thread
+        '''
+        if not self.per_worker or not self.phase_name:
+            yield self
+            return
+
+        with self.lock:
+            profile = self.task_profiles.get(name)
+            if profile is None:
+                profile = self.task_profiles[name] = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:                                                     # Python 3.12+: one profiler per process
+            self._single(e)
+            yield self
+            return
+
+        try:
+            yield self
+
+        finally:
+            profile.disable()
+
+
+    def _single(self, error):
+        '''
+        Falls back to the phase profile where only one profiler may be active
+        The sampled stacks still cover the worker threads
+        '''
+        with self.lock:
+            if self.per_worker:
+                self.per_worker = False
+                self.logger.warning(f'Per worker profiling not possible ({error}), '
+                                    'worker threads are only in the collapsed stacks')
+
+
+    def _summarize(self, name, sampler):
+        '''
+        Logs the leaf frames with the most samples, these cover all threads
+        The pstats files cover the calling thread and the profiled workers only
+        '''
+        leaves = Counter()
+        for stack, count in sampler.stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            if any(module in leaf for module in Profiler.WAITING):
+                leaf = '(waiting for locks, queues and pool tasks)'
+            leaves[leaf] += count
+        total = sum(leaves.values()) or 1
+        lines = [f'{count:8} {count / total:7.1%}  {frame}' for frame, count in leaves.most_common(self.top)]
+        self.logger.info(f'Profile of phase {name}, files in {self.folder}, own samples over all threads:\n'
+                         f'{"samples":>8} {"share":>7}  frame\n' + '\n'.join(lines))
+
+
+    class Sampler(object):
+        '''
+        Samples the stacks of all threads in a background thread
+        '''
+
+        def __init__(self, interval):
+            '''
+            Constructor
+            '''
+            self.interval = interval
+            self.stacks = Counter()
+            self.stopped = threading.Event()
+            self.thread = threading.Thread(target = self._run, name = 'profile-sampler', daemon = True)
+
+
+        def start(self):
+            '''
+            Starts sampling
+            '''
+            self.thread.start()
+
+
+        def stop(self):
+            '''
+            Stops sampling
+            '''
+            self.stopped.set()
+            self.thread.join()
+
+
+        def save(self, path):
+            '''
+            Writes the collapsed stacks, one "frame;frame;... count" line per stack
+            '''
+            with open(path, 'w', encoding = 'utf-8') as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f'{stack} {count}\n')
+
+
+        def _run(self):
+            '''
+            Takes a sample every interval
+            '''
+            own = threading.get_ident()
+            names = {}
+            while not self.stopped.wait(self.interval):
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    if ident not in names:
+                        names = { thread.ident: thread.name for thread in threading.enumerate() }
+
+                    frames = []
+                    while frame is not None:
+                        code = frame.f_code
+                        frames.append(f'{code.co_name} ({basename(code.co_filename)}:{code.co_firstlineno})')
+                        frame = frame.f_back
+
+                    frames.append(names.get(ident, str(ident)))                         # the thread is the root
+                    self.stacks[';'.join(reversed(frames))] += 1
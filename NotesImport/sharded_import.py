@@ -0,0 +1,284 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+
+ASSUMPTION: only the Data API backend is sharded, the database of a Joplin
+profile cannot take writes of several processes at once
+'''
+from os.path import join
+from os import cpu_count
+from queue import Empty
+import multiprocessing
+import time
+
+from logging_factory import LoggingFactory
+from importer import Importer
+from import_plan import Progress
+from events import Event, EventBus
+
+
+class ShardedImport(object):
+    '''
+    Imports an archive with several processes, each taking a share of the notebooks
+    The coordinator creates all folders and puts the resources shared by several
+    notebooks, hands each worker process the notes of its shard together with
+    the ids of the shared resources and merges their events, tags and reports. Every worker has its own
+    archive reader and Joplin connection pool and converts without sharing a GIL.
+    Offers the same methods as Importer to the Cli.
+    '''
+
+    def __init__(self, events, archive, token, insertion, processes, **options):
+        '''
+        Constructor
+        @param events: the EventBus receiving the merged progress events, None for a private one
+        @param processes: number of worker processes
+        @param options: keyword arguments of Importer, used by the coordinator and the workers
+        '''
+        self.logger = LoggingFactory('.').getLogger(self)
+        self.events = events or EventBus()
+        self.processes = processes
+        self.options = dict(options, archive = archive, token = token, insertion = insertion)
+        self.importer = Importer(self.events, archive, token, insertion, **options)        # folders and tags
+        self.progress = None
+        self.report = None
+
+
+    @property
+    def plan(self):
+        '''
+        The plan of the coordinator
+        '''
+        return self.importer.plan
+
+
+    def close(self):
+        '''
+        Releases the resources of the coordinator
+        '''
+        self.importer.close()
+
+
+    def scan(self):
+        '''
+        Scans the archive, see Importer.scan
+        '''
+        return self.importer.scan()
+
+
+    def assign_tags(self, mapping = None):
+        '''
+        Assigns tags, see Importer.assign_tags
+        '''
+        self.importer.assign_tags(mapping)
+
+
+    def import_it(self):
+        '''
+        Imports the archive
+        - Creates the folders, puts the shared resources and partitions the notebooks into shards
+        - Imports the shards in worker processes
+        - Assigns the tags collected by all workers
+        @return: the merged run report
+        '''
+        importer = self.importer
+        plan = importer.plan or importer.scan()
+        self.progress = Progress(plan)
+        importer.joplin._refresh()
+        insertion_id = importer.joplin._get_insertion_id()
+        self.logger.info(f'Inserting into: {importer.joplin.insertion}')
+        books = [importer._create_folders(insertion_id, book) for book in importer.qnap._get_structure()]
+
+        start = time.time()
+        with importer._profile('import'):
+            resources = self._put_shared(books)
+            shards = self._partition(books)
+            self.events.dispatch(force = True)
+            tag_notes, reports = self._run(shards, resources)
+        with importer._profile('tags'):
+            importer.assign_tags(tag_notes)
+
+        self.report = {
+            'processes': len(shards),
+            'seconds': time.time() - start,
+            'totals': dict(self.events.counts),
+            'shards': reports }
+        self.logger.info(f'Run report: {self.report}')
+        self.logger.info(f'Successfully imported QNAP Notes Archive: {importer.qnap.archive}')
+        return self.report
+
+
+    def _put_shared(self, books):
+        '''
+        Puts the resource blobs referenced from more than one notebook
+        The workers get their ids, so every blob is still posted once however the
+        notebooks are distributed. A failed upload is left to the workers.
+        @param books: list of notebooks, each a list of (note location, section folder id)
+        @return: dictionary (crc, size) -> Joplin resource id
+        '''
+        importer = self.importer
+        qnap = importer.qnap
+        qnap._get_blobs()                                                           # makes sure the archive is scanned
+        owners = {}                                                                 # blob key -> set of notebook indexes
+        first = {}                                                                  # blob key -> first note referencing it
+        for index, notes in enumerate(books):
+            for location, _ in notes:
+                for _, key in qnap.resources.get(location, ()):
+                    owners.setdefault(key, set()).add(index)
+                    first.setdefault(key, location)
+        shared = { key for key, indexes in owners.items() if len(indexes) > 1 }
+
+        futures = {}
+        for location in dict.fromkeys(location for key, location in first.items() if key in shared):
+            _, refs = importer._convert_note(qnap._get_note(location)['content'])      # titles are in the content
+            for kind, src, title in refs:
+                key = qnap._get_resource_key(location, kind, src)
+                if key in shared and key not in futures:
+                    futures[key] = importer.uploads.submit(importer._put_resource, location, kind, src, title, key)
+
+        ids = {}
+        for key, future in futures.items():
+            try:
+                ids[key] = future.result()
+            except Exception as e:
+                self.logger.error(f'Shared resource {key} not put, the shards put it themselves: {e}')
+        self.logger.info(f'{len(ids)} resources shared by notebooks put by the coordinator')
+        return ids
+
+
+    def _partition(self, books):
+        '''
+        Distributes the notebooks over the processes
+        The notebooks are balanced by footprint, largest first onto the lightest shard.
+        @param books: list of notebooks, each a list of (note location, section folder id)
+        @return: list of shards, each a list of (note location, section folder id)
+        '''
+        qnap = self.importer.qnap
+
+        def footprint(notes):
+            return sum(qnap._get_footprint(location) for location, _ in notes)
+
+        shards = [[] for _ in range(min(self.processes, len(books)))]
+        loads = [0] * len(shards)
+        for notes in sorted(books, key = footprint, reverse = True):
+            lightest = loads.index(min(loads))
+            shards[lightest].extend(notes)
+            loads[lightest] += footprint(notes)
+
+        self.logger.info(f'{len(books)} notebooks, shard footprints: {loads}')
+        return [shard for shard in shards if shard]
+
+
+    def _run(self, shards, resources):
+        '''
+        Runs a worker process per shard and republishes their messages
+        @param resources: dictionary (crc, size) -> Joplin resource id of the shared resources
+        @return: tuple (merged dictionary tag name -> list of note ids, list of shard reports)
+        '''
+        context = multiprocessing.get_context('spawn')                             # the coordinator runs threads
+        queue = context.Queue()
+        processes = []
+        for index, notes in enumerate(shards):
+            options = self._worker_options(index)
+            process = context.Process(target = _run_shard, args = (index, options, notes, resources, queue),
+                                      name = f'shard-{index}', daemon = True)
+            process.start()
+            processes.append(process)
+
+        tag_notes = {}
+        reports = [None] * len(shards)
+        snapshots = [(0, 0)] * len(shards)
+        pending = set(range(len(shards)))
+        try:
+            while pending:
+                try:
+                    message = queue.get(timeout = 0.1)
+                except Empty:
+                    for index in list(pending):                                     # crashed without a message
+                        if processes[index].exitcode not in (None, 0):
+                            pending.discard(index)
+                            self._failed(index, f'exit code {processes[index].exitcode}')
+                    self.events.dispatch()
+                    continue
+
+                kind, index = message[0], message[1]
+                if kind == 'events':
+                    for event_kind, name, bytes_, error in message[2]:
+                        self.events.publish(event_kind, name, bytes_, Exception(error) if error else None)
+                    snapshots[index] = message[3]
+                    self.progress.combine(snapshots)
+                elif kind == 'done':
+                    for name, note_ids in message[2].items():
+                        tag_notes.setdefault(name, []).extend(note_ids)
+                    reports[index] = message[3]
+                    pending.discard(index)
+                else:
+                    self._failed(index, message[2])
+                    pending.discard(index)
+                self.events.dispatch()
+
+        finally:
+            for process in processes:
+                if pending:
+                    process.terminate()
+                process.join()
+            self.events.dispatch(force = True)
+
+        return tag_notes, reports
+
+
+    def _worker_options(self, index):
+        '''
+        Returns the Importer arguments of a worker process
+        The reader threads are split among the processes
+        '''
+        options = dict(self.options)
+        if not options.get('readers'):
+            options['readers'] = max(1, (cpu_count() or 1) // self.processes)
+        if options.get('profile'):
+            options['profile'] = join(options['profile'], f'shard-{index}')
+        return options
+
+
+    def _failed(self, index, error):
+        '''
+        Reports a failed worker process, its notes are missing
+        '''
+        self.logger.error(f'Shard {index} failed: {error}')
+        self.events.publish(Event.ERROR, f'shard-{index}', error = Exception(error))
+
+
+def _run_shard(index, options, notes, resources, queue):
+    '''
+    Entry point of a worker process
+    The events are forwarded in batches together with a snapshot of the progress
+    @param index: index of the shard
+    @param options: keyword arguments of Importer
+    @param notes: list of (note location, section folder id)
+    @param resources: dictionary (crc, size) -> Joplin resource id of the resources put by the coordinator
+    @param queue: queue to the coordinator
+    '''
+    start = time.time()
+    importer = Importer(None, **options)
+
+    def forward(events):
+        progress = importer.progress
+        queue.put(('events', index,
+                   [(event.kind, event.name, event.bytes, str(event.error) if event.error else None) for event in events],
+                   (progress.notes, progress.bytes) if progress else (0, 0)))
+
+    importer.events.subscribe(forward, 0.1)
+    try:
+        tag_notes = importer.import_shard(notes, resources)
+        report = {
+            'notes': len(notes),
+            'seconds': time.time() - start,
+            'counts': dict(importer.events.counts) }
+        queue.put(('done', index, tag_notes, report))
+
+    except BaseException as e:
+        importer.logger.exception(f'Shard {index} failed')
+        queue.put(('failed', index, str(e)))
+
+    finally:
+        importer.close()
@@ -3,6 +3,7 @@ Created on 22.09.2021
 
 @author: juergen@habelt-jena.de
 '''
+import threading
 
 
 class StdoutRedirector(object):
@@ -11,6 +12,7 @@ class StdoutRedirector(object):
     Usage: 
     Activate:     sys.stdout = StdoutRedirector(widget)
     De-Activate:  sys.stdout = sys.__stdout__
+    Output of other threads is held back until drain is called from the GUI thread
     '''
 
 
@@ -19,12 +21,38 @@ class StdoutRedirector(object):
         Constructor
         '''
         self.text_edit = text_edit
+        self.pending = []
+        self.lock = threading.Lock()
         
 
     def write(self, text):
         '''
         Mimics output to console replacement in form of a TextEdit widget
         '''
+        if threading.current_thread() is not threading.main_thread():           # widgets must not be touched here
+            with self.lock:
+                self.pending.append(text)
+            return
+        
+        self.drain()
+        self._append(text)
+        
+        
+    def drain(self):
+        '''
+        Appends the output held back from other threads, must be called from the GUI thread
+        '''
+        with self.lock:
+            pending, self.pending = self.pending, []
+            
+        for text in pending:
+            self._append(text)
+            
+            
+    def _append(self, text):
+        '''
+        Appends a colored line to the widget
+        '''
         self.text_edit.append(f'<span style="color:{self._get_color(text)};">{text[ : -1]}</span>')        
        
        
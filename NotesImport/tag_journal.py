@@ -0,0 +1,110 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+'''
+from os.path import dirname, exists
+from os import makedirs, remove
+import json
+import threading
+
+
+class TagJournal(object):
+    '''
+    Journal of the tag assignment phase, makes the phase resumable
+    The first line holds the complete tag -> note ids mapping, every further
+    line one finished assignment. The file is removed when the phase completes.
+    '''
+
+    def __init__(self, path):
+        '''
+        Constructor
+        @param path: path of the journal file (json lines)
+        '''
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+
+
+    def exists(self):
+        '''
+        Tells whether an interrupted phase can be resumed
+        '''
+        return exists(self.path)
+
+
+    def start(self, mapping):
+        '''
+        Starts a new journal
+        @param mapping: dictionary tag name -> list of note ids
+        '''
+        folder = dirname(self.path)
+        if folder and not exists(folder):
+            makedirs(folder, exist_ok = True)
+
+        self.file = open(self.path, 'w', encoding = 'utf-8')
+        self.file.write(json.dumps({ 'tags': mapping }) + '\n')
+        self.file.flush()
+
+
+    def resume(self):
+        '''
+        Loads an interrupted journal and continues writing to it
+        @return: tuple (mapping, set of finished (tag name, note id) pairs)
+        '''
+        mapping, done = self._load()
+        self.file = open(self.path, 'a', encoding = 'utf-8')
+        return mapping, done
+
+
+    def pending(self):
+        '''
+        Loads the unfinished assignments of an interrupted journal
+        @return: dictionary tag name -> list of note ids
+        '''
+        mapping, done = self._load()
+        return { name: [note_id for note_id in note_ids if (name, note_id) not in done]
+                 for name, note_ids in mapping.items() }
+
+
+    def _load(self):
+        '''
+        Reads the journal file
+        @return: tuple (mapping, set of finished (tag name, note id) pairs)
+        '''
+        done = set()
+        with open(self.path, 'r', encoding = 'utf-8') as f:
+            mapping = json.loads(f.readline())['tags']
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:                                              # torn last line of an interruption
+                    continue
+                done.add((entry['tag'], entry['note']))
+        return mapping, done
+
+
+    def record(self, name, note_id):
+        '''
+        Records a finished assignment, may be called from any thread
+        '''
+        with self.lock:
+            self.file.write(json.dumps({ 'tag': name, 'note': note_id }) + '\n')
+            self.file.flush()
+
+
+    def close(self):
+        '''
+        Closes the journal, it stays for resumption
+        '''
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+    def finish(self):
+        '''
+        Removes the journal of a completed phase
+        '''
+        self.close()
+        remove(self.path)
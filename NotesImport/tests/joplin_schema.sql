@@ -0,0 +1,60 @@
+-- The tables written by JoplinDatabase as Joplin itself creates them,
+-- taken from the database.sqlite of a Joplin desktop profile (.schema)
+
+CREATE TABLE folders (id TEXT PRIMARY KEY, title TEXT NOT NULL DEFAULT "", created_time INT NOT NULL,
+    updated_time INT NOT NULL, user_created_time INT NOT NULL DEFAULT 0, user_updated_time INT NOT NULL DEFAULT 0,
+    encryption_cipher_text TEXT NOT NULL DEFAULT "", encryption_applied INT NOT NULL DEFAULT 0,
+    parent_id TEXT NOT NULL DEFAULT "", is_shared INT NOT NULL DEFAULT 0, share_id TEXT NOT NULL DEFAULT "",
+    master_key_id TEXT NOT NULL DEFAULT "", icon TEXT NOT NULL DEFAULT "", user_data TEXT NOT NULL DEFAULT "",
+    deleted_time INT NOT NULL DEFAULT 0);
+CREATE INDEX folders_title ON folders (title);
+CREATE INDEX folders_updated_time ON folders (updated_time);
+
+CREATE TABLE notes (id TEXT PRIMARY KEY, parent_id TEXT NOT NULL DEFAULT "", title TEXT NOT NULL DEFAULT "",
+    body TEXT NOT NULL DEFAULT "", created_time INT NOT NULL, updated_time INT NOT NULL,
+    is_conflict INT NOT NULL DEFAULT 0, latitude NUMERIC NOT NULL DEFAULT 0, longitude NUMERIC NOT NULL DEFAULT 0,
+    altitude NUMERIC NOT NULL DEFAULT 0, author TEXT NOT NULL DEFAULT "", source_url TEXT NOT NULL DEFAULT "",
+    is_todo INT NOT NULL DEFAULT 0, todo_due INT NOT NULL DEFAULT 0, todo_completed INT NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT "", source_application TEXT NOT NULL DEFAULT "",
+    application_data TEXT NOT NULL DEFAULT "", `order` NUMERIC NOT NULL DEFAULT 0,
+    user_created_time INT NOT NULL DEFAULT 0, user_updated_time INT NOT NULL DEFAULT 0,
+    encryption_cipher_text TEXT NOT NULL DEFAULT "", encryption_applied INT NOT NULL DEFAULT 0,
+    markup_language INT NOT NULL DEFAULT 1, is_shared INT NOT NULL DEFAULT 0, share_id TEXT NOT NULL DEFAULT "",
+    conflict_original_id TEXT DEFAULT NULL, master_key_id TEXT NOT NULL DEFAULT "",
+    user_data TEXT NOT NULL DEFAULT "", deleted_time INT NOT NULL DEFAULT 0);
+CREATE INDEX notes_title ON notes (title);
+CREATE INDEX notes_updated_time ON notes (updated_time);
+CREATE INDEX notes_is_conflict ON notes (is_conflict);
+CREATE INDEX notes_is_todo ON notes (is_todo);
+CREATE INDEX notes_order ON notes (`order`);
+
+CREATE TABLE tags (id TEXT PRIMARY KEY, title TEXT NOT NULL DEFAULT "", created_time INT NOT NULL,
+    updated_time INT NOT NULL, user_created_time INT NOT NULL DEFAULT 0, user_updated_time INT NOT NULL DEFAULT 0,
+    encryption_cipher_text TEXT NOT NULL DEFAULT "", encryption_applied INT NOT NULL DEFAULT 0,
+    is_shared INT NOT NULL DEFAULT 0, parent_id TEXT NOT NULL DEFAULT "", user_data TEXT NOT NULL DEFAULT "");
+CREATE INDEX tags_title ON tags (title);
+CREATE INDEX tags_updated_time ON tags (updated_time);
+
+CREATE TABLE note_tags (id TEXT PRIMARY KEY, note_id TEXT NOT NULL, tag_id TEXT NOT NULL, created_time INT NOT NULL,
+    updated_time INT NOT NULL, user_created_time INT NOT NULL DEFAULT 0, user_updated_time INT NOT NULL DEFAULT 0,
+    encryption_cipher_text TEXT NOT NULL DEFAULT "", encryption_applied INT NOT NULL DEFAULT 0,
+    is_shared INT NOT NULL DEFAULT 0);
+CREATE INDEX note_tags_note_id ON note_tags (note_id);
+CREATE INDEX note_tags_tag_id ON note_tags (tag_id);
+CREATE INDEX note_tags_updated_time ON note_tags (updated_time);
+
+CREATE TABLE resources (id TEXT PRIMARY KEY, title TEXT NOT NULL DEFAULT "", mime TEXT NOT NULL,
+    filename TEXT NOT NULL DEFAULT "", created_time INT NOT NULL, updated_time INT NOT NULL,
+    user_created_time INT NOT NULL DEFAULT 0, user_updated_time INT NOT NULL DEFAULT 0,
+    file_extension TEXT NOT NULL DEFAULT "", encryption_cipher_text TEXT NOT NULL DEFAULT "",
+    encryption_applied INT NOT NULL DEFAULT 0, encryption_blob_encrypted INT NOT NULL DEFAULT 0,
+    size INT NOT NULL DEFAULT -1, is_shared INT NOT NULL DEFAULT 0, share_id TEXT NOT NULL DEFAULT "",
+    master_key_id TEXT NOT NULL DEFAULT "", user_data TEXT NOT NULL DEFAULT "",
+    blob_updated_time INT NOT NULL DEFAULT 0, ocr_text TEXT NOT NULL DEFAULT "",
+    ocr_details TEXT NOT NULL DEFAULT "", ocr_status INT NOT NULL DEFAULT 0, ocr_error TEXT NOT NULL DEFAULT "");
+CREATE INDEX resources_title ON resources (title);
+CREATE INDEX resources_updated_time ON resources (updated_time);
+
+CREATE TABLE resource_local_states (id INTEGER PRIMARY KEY, resource_id TEXT NOT NULL,
+    fetch_status INT NOT NULL DEFAULT "2", fetch_error TEXT NOT NULL DEFAULT "");
+CREATE INDEX resource_local_states_resource_id ON resource_local_states (resource_id);
@@ -0,0 +1,251 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+
+Imports a small generated archive into a database with Joplin's own tables (joplin_schema.sql)
+'''
+from os.path import join, abspath, dirname, exists
+from os import chdir, getcwd, makedirs, listdir
+from tempfile import TemporaryDirectory
+from zipfile import ZipFile
+import unittest
+import sqlite3
+import json
+import sys
+
+FOLDER = dirname(dirname(abspath(__file__)))                                        # the NotesImport folder
+sys.path.insert(0, FOLDER)
+
+from importer import Importer
+
+
+SCHEMA = join(dirname(abspath(__file__)), 'joplin_schema.sql')                     # the tables as Joplin creates them
+IMAGE = b'\x89PNG image data' * 100
+ATTACHMENT = b'%PDF attachment data' * 100
+
+
+def create_profile(profile):
+    '''
+    Creates a profile database with Joplin's own tables and the insertion folder 'Import'
+    '''
+    makedirs(profile)
+    with open(SCHEMA, 'r') as f:
+        schema = f.read()
+    with sqlite3.connect(join(profile, 'database.sqlite')) as db:
+        db.executescript(schema)
+        db.execute('INSERT INTO folders (id, title, created_time, updated_time) VALUES (?, ?, 0, 0)', ('root', 'Import'))
+
+
+def note_content(name, resources):
+    '''
+    Returns the content of a note with a heading, a paragraph and the given resources
+    '''
+    content = [
+        { 'type': 'heading', 'attrs': { 'level': 1 }, 'content': [{ 'type': 'text', 'text': name }] },
+        { 'type': 'paragraph', 'content': [{ 'type': 'text', 'text': 'Body', 'marks': [{ 'type': 'strong' }] }] }]
+    for kind, id_, title in resources:
+        content.append({ 'type': 'paragraph', 'content': [
+            { 'type': 'image' if kind == 'image' else 'file', 'attrs': { 'src': f'x/{kind}/{id_}', 'title': title } }] })
+    return json.dumps({ 'type': 'doc', 'content': content })
+
+
+def write_archive(path, inserted = False):
+    '''
+    Writes 2 notebooks with a section of 2 notes each, every note has the
+    same image, the notes n/1/1 the same attachment
+    @param inserted: a note Note n/1/0 is inserted in front of each section,
+                     which shifts the locations, and Note n/1/1 loses its notebook tag
+    '''
+    structure = { 'notebooks': [] }
+    with ZipFile(path, 'w') as zip_file:
+        for book in range(2):
+            notes = []
+            names = [f'{book + 1}/1/{note}' for note in range(0 if inserted else 1, 3)]
+            for note, name in enumerate(names):
+                location = f'{book + 1}/1/{note + 1}'
+                index = name.split('/')[-1]
+                resources = [('image', f'img{index}', 'picture.png')]
+                if index == '1':
+                    resources.append(('attachment', f'att{index}', 'document.pdf'))
+                for kind, id_, _ in resources:
+                    zip_file.writestr(f'{location}/{kind}/{id_}', IMAGE if kind == 'image' else ATTACHMENT)
+                tags = [{ 'tag_name': 'All' }, { 'tag_name': f'Book{book}' }]
+                if inserted and name.endswith('/1'):
+                    tags = tags[ : 1]
+                note_file = { 'note_name': f'Note {name}', 'content': note_content(name, resources), 'tag_list': tags }
+                zip_file.writestr(f'{location}/noteInfo.json', json.dumps(note_file))
+                notes.append({ 'note_location': location })
+            structure['notebooks'].append({ 'nb_name': f'Book {book}',
+                                            'sec_list': [{ 'sec_name': f'Section {book}', 'note_list': notes }] })
+        zip_file.writestr('data.json', json.dumps(structure))
+
+
+class TestJoplinDatabase(unittest.TestCase):
+    '''
+    Checks the rows and files written by the database backend
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        '''
+        Imports the archive once, the logging configuration is found relative to the NotesImport folder
+        '''
+        cls.cwd = getcwd()
+        chdir(FOLDER)
+        if not exists('LoggingFiles'):
+            makedirs('LoggingFiles')
+
+        cls.temp = TemporaryDirectory()
+        archive = join(cls.temp.name, 'test.ns3')
+        cls.profile = join(cls.temp.name, 'profile')
+        write_archive(archive)
+        create_profile(cls.profile)
+
+        importer = Importer(None, archive, '', 'Import', database = cls.profile, 
+                            tag_journal = join(cls.temp.name, 'TagJournal.jsonl'))
+        try:
+            importer.import_it()
+        finally:
+            importer.close()
+        cls.db = sqlite3.connect(join(cls.profile, 'database.sqlite'))
+
+
+    @classmethod
+    def tearDownClass(cls):
+        '''
+        Removes the profile
+        '''
+        cls.db.close()
+        cls.temp.cleanup()
+        chdir(cls.cwd)
+
+
+    def test_folders(self):
+        '''
+        Notebooks below the insertion folder, sections below their notebook
+        '''
+        folders = { title: (id_, parent_id) for id_, title, parent_id in self.db.execute('SELECT id, title, parent_id FROM folders') }
+        self.assertEqual(len(folders), 5)
+        for book in range(2):
+            self.assertEqual(folders[f'Book {book}'][1], 'root')
+            self.assertEqual(folders[f'Section {book}'][1], folders[f'Book {book}'][0])
+
+
+    def test_notes(self):
+        '''
+        All notes are in their section and link existing resources
+        '''
+        resources = { id_ for id_, in self.db.execute('SELECT id FROM resources') }
+        notes = self.db.execute('SELECT n.title, n.body, f.title FROM notes n JOIN folders f ON n.parent_id = f.id').fetchall()
+        self.assertEqual(len(notes), 4)
+        for title, body, section in notes:
+            self.assertEqual(section, f'Section {int(title.split()[1].split("/")[0]) - 1}')
+            self.assertIn('**Body**', body)
+            self.assertNotIn('\0', body)
+            links = [part.split(')')[0] for part in body.split('](:/')[1:]]
+            self.assertTrue(links)
+            self.assertTrue(set(links) <= resources)
+
+
+    def test_resources(self):
+        '''
+        Equal blobs are stored once, as file and as row with a local state
+        '''
+        rows = self.db.execute('SELECT id, title, file_extension, size FROM resources').fetchall()
+        self.assertEqual(sorted(title for _, title, _, _ in rows), ['document.pdf', 'picture.png'])
+        files = listdir(join(self.profile, 'resources'))
+        self.assertEqual(len(files), 2)
+        for id_, title, extension, size in rows:
+            with open(join(self.profile, 'resources', f'{id_}.{extension}'), 'rb') as f:
+                self.assertEqual(f.read(), IMAGE if title == 'picture.png' else ATTACHMENT)
+            self.assertEqual(size, len(IMAGE if title == 'picture.png' else ATTACHMENT))
+        states = self.db.execute('SELECT resource_id FROM resource_local_states').fetchall()
+        self.assertEqual(sorted(id_ for id_, in states), sorted(id_ for id_, _, _, _ in rows))
+
+
+    def test_note_tags(self):
+        '''
+        Every note has the common tag and the tag of its notebook, once each
+        '''
+        rows = self.db.execute('SELECT n.title, t.title FROM note_tags nt JOIN notes n ON nt.note_id = n.id '
+                               'JOIN tags t ON nt.tag_id = t.id').fetchall()
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(len(set(rows)), 8)
+        for title, tag in rows:
+            book = int(title.split()[1].split('/')[0]) - 1
+            self.assertIn(tag, ('all', f'book{book}'))
+
+
+class TestJoplinDatabaseSync(unittest.TestCase):
+    '''
+    Checks a second synchronization after notes were inserted and retagged
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        '''
+        Synchronizes the archive, then the archive with the inserted notes
+        '''
+        cls.cwd = getcwd()
+        chdir(FOLDER)
+        if not exists('LoggingFiles'):
+            makedirs('LoggingFiles')
+
+        cls.temp = TemporaryDirectory()
+        archive = join(cls.temp.name, 'test.ns3')
+        profile = join(cls.temp.name, 'profile')
+        create_profile(profile)
+
+        importer = Importer(None, archive, '', 'Import', database = profile, 
+                            tag_journal = join(cls.temp.name, 'TagJournal.jsonl'))
+        state = {}
+        try:
+            write_archive(archive)
+            importer.open_archive(archive)
+            importer.sync(state)
+            write_archive(archive, inserted = True)
+            importer.open_archive(archive)
+            cls.count = importer.sync(state)
+        finally:
+            importer.close()
+        cls.db = sqlite3.connect(join(profile, 'database.sqlite'))
+
+
+    @classmethod
+    def tearDownClass(cls):
+        '''
+        Removes the profile
+        '''
+        cls.db.close()
+        cls.temp.cleanup()
+        chdir(cls.cwd)
+
+
+    def test_notes(self):
+        '''
+        The inserted notes are new, the shifted notes keep their content
+        '''
+        self.assertEqual(self.count, 4)                                             # 2 inserted, 2 retagged
+        notes = self.db.execute('SELECT title, body FROM notes').fetchall()
+        self.assertEqual(len(notes), 6)
+        for title, body in notes:
+            self.assertIn(f'# {title.split()[1]}', body)
+
+
+    def test_note_tags(self):
+        '''
+        Links are not duplicated, removed tags are unlinked
+        '''
+        rows = self.db.execute('SELECT n.title, t.title FROM note_tags nt JOIN notes n ON nt.note_id = n.id '
+                               'JOIN tags t ON nt.tag_id = t.id').fetchall()
+        self.assertEqual(len(rows), len(set(rows)))
+        self.assertEqual(len(rows), 10)
+        for title, tag in rows:
+            book = int(title.split()[1].split('/')[0]) - 1
+            self.assertIn(tag, ('all', f'book{book}') if not title.endswith('/1') else ('all',))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,168 @@
+'''
+Created on 19.10.2026
+
+@author: juergen@habelt-jena.de
+'''
+from os.path import join, basename, dirname, exists
+from os import scandir, makedirs, replace
+from zipfile import ZipFile, BadZipFile
+import threading
+import json
+import time
+
+from logging_factory import LoggingFactory
+
+
+class Watcher(object):
+    '''
+    Watches a folder for new or changed archives and synchronizes them into Joplin
+    An archive is taken when its size and modification time stayed the same for
+    the settle time and its zip directory can be read. The same Importer serves
+    all synchronizations, so the Joplin connections, the metadata mirror and the
+    caches stay warm; the sync state makes every run incremental.
+    The sync state is kept per insertion notebook, not per archive, so an export
+    dropped under a new file name continues where the earlier exports stopped.
+    '''
+    SUFFIX = '.ns3'
+
+    def __init__(self, importer, folder, state = './CacheFiles/SyncState.json', interval = 2.0, settle = 5.0,
+                 retry = 60.0):
+        '''
+        Constructor
+        @param importer: the Importer doing the synchronizations
+        @param folder: the folder to watch
+        @param state: path of the json file keeping the sync state of every insertion notebook
+        @param interval: seconds between two polls of the folder
+        @param settle: seconds an archive must stay unchanged before it is taken
+        @param retry: seconds after which a failed synchronization of an unchanged archive is repeated
+        '''
+        self.logger = LoggingFactory('.').getLogger(self)
+        self.importer = importer
+        self.folder = folder
+        self.state_path = state
+        self.interval = interval
+        self.settle = settle
+        self.retry = retry
+        self.seen = {}                                                              # path -> (stat, first seen)
+        self.failed = {}                                                            # path -> (stat, time) of a failed sync
+        self.stopped = threading.Event()
+        self.state = self._load_state()
+
+
+    def run(self):
+        '''
+        Polls the folder until stop is called
+        '''
+        self.logger.info(f'Watching {self.folder} for {Watcher.SUFFIX} archives')
+        while not self.stopped.is_set():
+            for path in self.poll():
+                self._sync(path)
+            self.stopped.wait(self.interval)
+
+
+    def stop(self):
+        '''
+        Stops the watch loop, may be called from any thread
+        '''
+        self.stopped.set()
+
+
+    def poll(self):
+        '''
+        Scans the folder once
+        @return: list of the archives ready for synchronization
+        '''
+        now = time.time()
+        current = {}
+        for entry in scandir(self.folder):
+            if entry.is_file() and entry.name.lower().endswith(Watcher.SUFFIX):
+                stat = entry.stat()
+                current[entry.path] = [stat.st_size, stat.st_mtime_ns]
+
+        ready = []
+        for path, stat in current.items():
+            previous = self.seen.get(path)
+            if not previous or previous[0] != stat:                                 # new or still being written
+                self.seen[path] = (stat, now)
+                continue
+            if now - previous[1] < self.settle:
+                continue
+            if stat == self._target().get('archives', {}).get(basename(path)):
+                continue
+            failed = self.failed.get(path)
+            if failed and failed[0] == stat and now - failed[1] < self.retry:
+                continue
+            if self._complete(path):
+                ready.append(path)
+
+        for path in list(self.seen):
+            if path not in current:
+                del self.seen[path]
+        return ready
+
+
+    def _complete(self, path):
+        '''
+        Tells whether the zip directory of the archive can be read
+        '''
+        try:
+            with ZipFile(path) as zip_file:
+                zip_file.getinfo('data.json')
+            return True
+        except (BadZipFile, KeyError, OSError) as _:
+            return False
+
+
+    def _sync(self, path):
+        '''
+        Synchronizes an archive, the state is saved even after a failure
+        An archive with failed notes or tag assignments keeps the stat of its last
+        complete sync and is synchronized again after the retry time
+        '''
+        stat = self.seen[path][0]
+        state = self._target()
+        start = time.time()
+        try:
+            self.importer.open_archive(path)
+            count = self.importer.sync(state)
+            state.setdefault('archives', {})[basename(path)] = stat
+            self.failed.pop(path, None)
+            self.logger.info(f'{basename(path)}: {count} notes in {time.time() - start:.1f} s')
+
+        except Exception as _:
+            self.failed[path] = (stat, time.time())                                 # retried later or when it changes
+            self.logger.exception(f'Synchronization of {path} failed')
+
+        finally:
+            self._save_state()
+
+
+    def _target(self):
+        '''
+        Returns the sync state of the insertion notebook, the archives synchronized into it
+        share the folders and notes and keep their stat under 'archives'
+        '''
+        return self.state.setdefault(self.importer.joplin.insertion, {})
+
+
+    def _load_state(self):
+        '''
+        Loads the sync state of all archives
+        '''
+        if not exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r', encoding = 'utf-8') as f:
+            return json.load(f)
+
+
+    def _save_state(self):
+        '''
+        Saves the sync state atomically
+        '''
+        folder = dirname(self.state_path)
+        if folder and not exists(folder):
+            makedirs(folder, exist_ok = True)
+        temp = join(folder, basename(self.state_path) + '.tmp')
+        with open(temp, 'w', encoding = 'utf-8') as f:
+            json.dump(self.state, f)
+        replace(temp, self.state_path)